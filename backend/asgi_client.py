@@ -0,0 +1,62 @@
+"""
+Minimal in-process ASGI client.
+
+Calls the app directly on the current event loop, without a server or an
+HTTP client library. Used by the query budget check and the load benchmark.
+"""
+
+import asyncio
+from urllib.parse import urlsplit
+
+
+async def request(
+    app,
+    method: str,
+    url: str,
+    body: bytes = b"",
+    content_type: str = "application/json",
+    headers: dict[str, str] | None = None,
+) -> tuple[str | None, int, bytes]:
+    """
+    Send one request to `app` and return (matched route template, status, body).
+    The client stays connected until the response is complete, so streamed
+    responses are read to the end.
+    """
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "root_path": "",
+        "query_string": parts.query.encode(),
+        "headers": [
+            (b"host", b"in-process"),
+            (b"content-type", content_type.encode()),
+            *((name.lower().encode(), value.encode()) for name, value in (headers or {}).items()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("in-process", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    status, chunks = 0, []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    route = getattr(scope.get("route"), "path", None)
+    return route, status, b"".join(chunks)
@@ -0,0 +1,112 @@
+"""
+Async mode for the API endpoints.
+
+With `DB_ASYNC=1`, `install(app)` replaces every route that depends on the
+synchronous `get_db` session with an `async def` endpoint that receives an
+AsyncSession. The original endpoint body runs through
+`AsyncSession.run_sync`, which executes it on the event loop while every
+database round trip is awaited on the async driver (aiosqlite / asyncpg).
+Request handling therefore no longer occupies a threadpool worker per
+request, and one uvicorn worker can keep many requests in flight.
+
+Dependencies that take a `db` session themselves (the ETag check of
+`conditional`) are converted the same way. FastAPI caches `get_async_db`
+per request, so they share the endpoint's AsyncSession instead of opening a
+sync session of their own on the threadpool.
+
+The endpoint code itself stays written once, against the sync Session API.
+"""
+
+import functools
+import inspect
+
+from fastapi import Depends, FastAPI
+from fastapi.params import Depends as DependsParam
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def make_async(endpoint, get_db):
+    """
+    Wrap a sync endpoint whose `db` parameter is `Depends(get_db)` into a
+    coroutine endpoint with the same signature, backed by an AsyncSession.
+    Dependencies declared as parameters are converted too when they use `db`.
+    """
+    signature = inspect.signature(endpoint)
+    params = [
+        p.replace(annotation=AsyncSession, default=Depends(get_async_db))
+        if _is_db_param(p, get_db)
+        else p.replace(default=_convert_depends(p.default, get_db))
+        for p in signature.parameters.values()
+    ]
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        db: AsyncSession = kwargs.pop("db")
+        return await db.run_sync(lambda session: endpoint(db=session, **kwargs))
+
+    wrapper.__signature__ = signature.replace(parameters=params)
+    return wrapper
+
+
+def _is_db_param(param: inspect.Parameter, get_db) -> bool:
+    return param.name == "db" and getattr(param.default, "dependency", None) is get_db
+
+
+def _uses_db(call, get_db) -> bool:
+    if call is None or inspect.iscoroutinefunction(call) or inspect.isasyncgenfunction(call):
+        return False
+    try:
+        params = inspect.signature(call).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(_is_db_param(p, get_db) for p in params)
+
+
+def _convert_depends(default, get_db):
+    """`Depends(dep)` with `dep` made async when it takes a `db` session."""
+    if not isinstance(default, DependsParam) or not _uses_db(default.dependency, get_db):
+        return default
+    return Depends(make_async(default.dependency, get_db), use_cache=default.use_cache)
+
+
+def install(app: FastAPI, get_db) -> int:
+    """
+    Swap the routes of `app` that use `get_db` for async versions.
+    Returns the number of converted routes.
+    """
+    converted = 0
+    for index, route in enumerate(app.router.routes):
+        if not isinstance(route, APIRoute) or inspect.iscoroutinefunction(route.endpoint):
+            continue
+        dependencies = [_convert_depends(d, get_db) for d in route.dependencies]
+        if not _uses_db(route.endpoint, get_db) and dependencies == route.dependencies:
+            continue
+        app.router.routes[index] = APIRoute(
+            route.path,
+            make_async(route.endpoint, get_db)
+            if _uses_db(route.endpoint, get_db)
+            else route.endpoint,
+            response_model=route.response_model,
+            status_code=route.status_code,
+            dependencies=dependencies,
+            tags=route.tags,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            deprecated=route.deprecated,
+            methods=route.methods,
+            name=route.name,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+        )
+        converted += 1
+    return converted
@@ -0,0 +1,148 @@
+"""
+Load benchmark comparing the sync (threadpool) and async (DB_ASYNC=1) modes.
+
+For each mode a uvicorn server is started in a fresh temporary directory (so
+it gets its own SQLite file), seeded over HTTP, and then hit with a fixed
+number of concurrent GET requests. Latency percentiles and throughput are
+printed per mode. Only the standard library is used on the client side.
+
+Run from the backend directory:
+
+    python benchmarks/async_vs_sync.py --concurrency 64 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _post(base: str, path: str, payload: dict) -> dict:
+    request = urllib.request.Request(
+        base + path,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def seed(base: str, applications: int) -> None:
+    recruiter = _post(base, "/recruiters", {"name": "Bench Recruiter"})
+    client_id = json.loads(urllib.request.urlopen(base + "/clients").read())[0]["id"]
+    vacancy = _post(
+        base, "/vacancies", {"client_id": client_id, "title": "Engineer", "fee_amount": 1000}
+    )
+    for i in range(applications):
+        candidate = _post(base, "/candidates", {"full_name": f"Candidate {i}"})
+        _post(
+            base,
+            "/applications",
+            {
+                "candidate_id": candidate["id"],
+                "vacancy_id": vacancy["id"],
+                "recruiter_id": recruiter["id"],
+                "date_contacted": "2024-01-15",
+                "status": "new",
+            },
+        )
+
+
+async def _get(host: str, port: int, path: str) -> float:
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    status = await reader.readline()
+    await reader.read()
+    writer.close()
+    if b" 200 " not in status:
+        raise RuntimeError(f"{path}: {status.decode().strip()}")
+    return time.perf_counter() - started
+
+
+async def load(host: str, port: int, paths: list[str], total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int):
+        async with semaphore:
+            latencies.append(await _get(host, port, paths[i % len(paths)]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, time.perf_counter() - started
+
+
+def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base + "/health")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def run_mode(async_mode: bool, args: argparse.Namespace) -> dict:
+    port = args.port + int(async_mode)
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DB_ASYNC="1" if async_mode else "0", PYTHONPATH=str(BACKEND_DIR))
+    with tempfile.TemporaryDirectory() as workdir:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir,
+            env=env,
+        )
+        try:
+            _wait_ready(base)
+            seed(base, args.applications)
+            paths = ["/pipeline?limit=100", "/clients", "/reports/earnings/summary?year=2024&month=1"]
+            latencies, elapsed = asyncio.run(
+                load("127.0.0.1", port, paths, args.requests, args.concurrency)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+
+    def pick(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return {
+        "mode": "async" if async_mode else "sync",
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(pick(0.50), 2),
+        "p95_ms": round(pick(0.95), 2),
+        "p99_ms": round(pick(0.99), 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--applications", type=int, default=300)
+    parser.add_argument("--port", type=int, default=18700)
+    args = parser.parse_args()
+
+    results = [run_mode(False, args), run_mode(True, args)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
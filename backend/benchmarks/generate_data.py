@@ -0,0 +1,351 @@
+"""
+Synthetic data generator for benchmarks.
+
+Seeds the configured database (`DATABASE_URL`) with clients, recruiters,
+vacancies, candidates, applications and payments at a chosen scale. The
+distributions aim to look like real usage rather than uniform noise:
+
+- client size is Zipf-like, so a few clients own most vacancies and
+  applications
+- recruiter workloads are skewed the same way
+- first contacts grow towards the present
+- older applications are more likely to be closed (hired or rejected)
+- time to hire and to rejection are log-normal
+- hired applications are paid in one or more installments of the vacancy
+  fee, and the cached payment fields match the payments table
+- a small share of hires are replacements
+
+Rows are written in batches with explicit ids. Afterwards the earnings
+rollup, the funnel counters and the pipeline read model are rebuilt and the
+search index is set up.
+Dates are relative to today; otherwise the data only depends on --seed.
+
+Run from the backend directory, against a scratch database:
+
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/generate_data.py --scale medium
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/generate_data.py \\
+        --clients 10000 --candidates 1000000 --applications 3000000 --payments 5000000
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+import earnings_rollup  # noqa: E402
+import migrations  # noqa: E402
+import pipeline_stats  # noqa: E402
+import read_model  # noqa: E402
+import search_index  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models import Application, Candidate, Client, Payment, Recruiter, Vacancy  # noqa: E402
+
+SCALES = {
+    "small": dict(clients=50, recruiters=10, candidates=5_000, applications=15_000, payments=4_000),
+    "medium": dict(
+        clients=1_000, recruiters=60, candidates=100_000, applications=300_000, payments=500_000
+    ),
+    "large": dict(
+        clients=10_000,
+        recruiters=300,
+        candidates=1_000_000,
+        applications=3_000_000,
+        payments=5_000_000,
+    ),
+}
+
+BATCH_SIZE = 10_000
+
+FIRST_NAMES = (
+    "Alexander Anna Dmitry Elena Ivan Maria Sergey Olga Andrey Natalia Pavel Irina Mikhail "
+    "Tatiana Nikolai Ekaterina Alexey Svetlana Maxim Yulia John Emma Liam Olivia Noah Sophia"
+).split()
+LAST_NAMES = (
+    "Ivanov Smirnov Kuznetsov Popov Vasiliev Petrov Sokolov Mikhailov Novikov Fedorov "
+    "Morozov Volkov Alekseev Lebedev Semenov Egorov Pavlov Kozlov Stepanov Nikolaev "
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Wilson Taylor"
+).split()
+TITLES = (
+    "Python Developer", "Java Developer", "Frontend Developer", "DevOps Engineer",
+    "Data Engineer", "QA Engineer", "Product Manager", "Project Manager", "Designer",
+    "Data Scientist", "Team Lead", "Analyst", "Sales Manager", "Accountant", "HR Manager",
+)
+COMPANY_WORDS = (
+    "Tech Soft Data Cloud Net Systems Labs Group Digital Solutions Logic Smart Media "
+    "Finance Retail Logistics Energy Health"
+).split()
+
+
+def zipf_cum_weights(n: int, s: float = 1.1) -> list[float]:
+    return list(itertools.accumulate(1 / (rank**s) for rank in range(1, n + 1)))
+
+
+def poisson(rng: random.Random, lam: float) -> int:
+    """Knuth's method; fine for the small means used here."""
+    if lam <= 0:
+        return 0
+    limit, k, p = math.exp(-lam), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def lognormal_days(rng: random.Random, mean_days: float, sigma: float = 0.6) -> int:
+    mu = math.log(mean_days) - sigma**2 / 2
+    return max(1, int(rng.lognormvariate(mu, sigma)))
+
+
+def batched(rows, size: int = BATCH_SIZE):
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class Generator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.today = date.today()
+        self.first_day = self.today - timedelta(days=365 * args.years)
+
+    def _next_id(self, db, model) -> int:
+        return (db.scalar(select(func.max(model.id))) or 0) + 1
+
+    def _insert(self, db, model, rows) -> int:
+        total = 0
+        for batch in batched(rows):
+            db.execute(insert(model), batch)
+            db.commit()
+            total += len(batch)
+        return total
+
+    def clients(self, db) -> list[int]:
+        start = self._next_id(db, Client)
+        words = COMPANY_WORDS
+        rows = [
+            {
+                "id": start + i,
+                "name": f"{self.rng.choice(words)} {self.rng.choice(words)} #{start + i}",
+            }
+            for i in range(self.args.clients)
+        ]
+        self._insert(db, Client, rows)
+        return [row["id"] for row in rows]
+
+    def recruiters(self, db) -> list[int]:
+        start = self._next_id(db, Recruiter)
+        rows = [
+            {
+                "id": start + i,
+                "name": f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)} #{start + i}",
+            }
+            for i in range(self.args.recruiters)
+        ]
+        self._insert(db, Recruiter, rows)
+        return [row["id"] for row in rows]
+
+    def vacancies(self, db, client_ids: list[int]) -> list[tuple[int, float, float]]:
+        """Returns (vacancy id, fee, cumulative pick weight) in id order."""
+        start = self._next_id(db, Vacancy)
+        client_weights = zipf_cum_weights(len(client_ids))
+        count = max(len(client_ids), int(len(client_ids) * self.args.vacancies_per_client))
+        rows = []
+        for i in range(count):
+            # Every client gets at least one vacancy, the rest follow client size
+            client_index = (
+                i
+                if i < len(client_ids)
+                else bisect.bisect(client_weights, self.rng.random() * client_weights[-1])
+            )
+            client_index = min(client_index, len(client_ids) - 1)
+            rows.append(
+                {
+                    "id": start + i,
+                    "client_id": client_ids[client_index],
+                    "title": self.rng.choice(TITLES),
+                    "fee_amount": float(self.rng.choice((500, 800, 1000, 1500, 2000, 3000, 5000))),
+                    "_weight": 1 / (client_index + 1) ** 1.1,
+                }
+            )
+        weights = list(itertools.accumulate(row.pop("_weight") for row in rows))
+        self._insert(db, Vacancy, rows)
+        return [(row["id"], row["fee_amount"], w) for row, w in zip(rows, weights)]
+
+    def candidates(self, db) -> tuple[int, int]:
+        start = self._next_id(db, Candidate)
+        rng = self.rng
+
+        def rows():
+            for i in range(self.args.candidates):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                yield {
+                    "id": start + i,
+                    "full_name": f"{first} {last}",
+                    "phone": f"+7 9{rng.randrange(10**8, 10**9)}" if rng.random() < 0.8 else None,
+                    "email": f"{first}.{last}{start + i}@example.com".lower()
+                    if rng.random() < 0.7
+                    else None,
+                    "notes": None,
+                }
+
+        self._insert(db, Candidate, rows())
+        return start, start + self.args.candidates - 1
+
+    def applications(self, db, candidate_range, vacancies, recruiter_ids) -> tuple[int, int]:
+        rng = self.rng
+        args = self.args
+        start_id = self._next_id(db, Application)
+        payment_id = itertools.count(self._next_id(db, Payment))
+        span = (self.today - self.first_day).days
+        vacancy_weights = [w for _, _, w in vacancies]
+        recruiter_weights = zipf_cum_weights(len(recruiter_ids), 0.8)
+        hire_share = 0.12
+        # Installments per hired application to reach the payments target
+        extra_installments = max(args.payments / max(args.applications * hire_share, 1) - 1, 0)
+        hired_ids: list[int] = []
+        payments_total = 0
+
+        def pick(cum_weights):
+            return bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+
+        def rows():
+            nonlocal payments_total
+            for i in range(args.applications):
+                app_id = start_id + i
+                contacted = self.first_day + timedelta(days=int(span * math.sqrt(rng.random())))
+                age = (self.today - contacted).days
+                vacancy_id, fee, _ = vacancies[min(pick(vacancy_weights), len(vacancies) - 1)]
+                closed = rng.random() < min(0.9, age / 90)
+                roll = rng.random()
+                status, rejection_date, start_date = "new", None, None
+                if closed and roll < hire_share / 0.75:
+                    status = "hired"
+                    start_date = min(self.today, contacted + timedelta(days=lognormal_days(rng, 35)))
+                elif closed and roll < 0.85:
+                    status = "rejected"
+                    rejection_date = min(
+                        self.today, contacted + timedelta(days=lognormal_days(rng, 12))
+                    )
+                elif rng.random() < 0.5:
+                    status = "in_process"
+
+                payments = []
+                if status == "hired":
+                    installments = 1 + poisson(rng, extra_installments)
+                    part = round(fee / installments, 2)
+                    for n in range(installments):
+                        paid_date = start_date + timedelta(days=30 * n + rng.randrange(0, 10))
+                        if paid_date > self.today:
+                            break
+                        payments.append(
+                            {
+                                "id": next(payment_id),
+                                "application_id": app_id,
+                                "paid_date": paid_date,
+                                "amount": part,
+                                "note": None,
+                                "created_at": datetime.combine(paid_date, datetime.min.time()),
+                            }
+                        )
+                replacement_of = None
+                if status == "hired" and hired_ids and rng.random() < 0.02:
+                    replacement_of = rng.choice(hired_ids)
+                if status == "hired" and len(hired_ids) < 100_000:
+                    hired_ids.append(app_id)
+
+                payments_total += len(payments)
+                yield (
+                    {
+                        "id": app_id,
+                        "candidate_id": rng.randint(*candidate_range),
+                        "vacancy_id": vacancy_id,
+                        "recruiter_id": recruiter_ids[
+                            min(pick(recruiter_weights), len(recruiter_ids) - 1)
+                        ],
+                        "date_contacted": contacted,
+                        "status": status,
+                        "rejection_date": rejection_date,
+                        "start_date": start_date,
+                        "paid": bool(payments),
+                        "paid_date": max((p["paid_date"] for p in payments), default=None),
+                        "payment_amount": round(sum(p["amount"] for p in payments), 2),
+                        "is_replacement": replacement_of is not None,
+                        "replacement_of_id": replacement_of,
+                        "replacement_note": "replacement hire" if replacement_of else None,
+                        "created_at": datetime.combine(contacted, datetime.min.time())
+                        + timedelta(seconds=rng.randrange(86_400)),
+                    },
+                    payments,
+                )
+
+        for batch in batched(rows()):
+            db.execute(insert(Application), [app for app, _ in batch])
+            payments = [p for _, group in batch for p in group]
+            if payments:
+                db.execute(insert(Payment), payments)
+            db.commit()
+        return args.applications, payments_total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for name in ("clients", "recruiters", "candidates", "applications", "payments"):
+        parser.add_argument(f"--{name}", type=int, help=f"override the {name} count of --scale")
+    parser.add_argument("--vacancies-per-client", type=float, default=3.0)
+    parser.add_argument("--years", type=int, default=3, help="history length")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    for name, value in SCALES[args.scale].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    migrations.upgrade(engine)
+    generator = Generator(args)
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        client_ids = generator.clients(db)
+        recruiter_ids = generator.recruiters(db)
+        vacancies = generator.vacancies(db, client_ids)
+        candidate_range = generator.candidates(db)
+        applications, payments = generator.applications(
+            db, candidate_range, vacancies, recruiter_ids
+        )
+        earnings_rollup.rebuild(db)
+        pipeline_stats.rebuild(db)
+        read_model.rebuild(db)
+    finally:
+        db.close()
+    # Populates a newly created index; an existing one was kept in sync by its triggers
+    search_index.install(engine)
+
+    print(
+        json.dumps(
+            {
+                "clients": len(client_ids),
+                "recruiters": len(recruiter_ids),
+                "vacancies": len(vacancies),
+                "candidates": candidate_range[1] - candidate_range[0] + 1,
+                "applications": applications,
+                "payments": payments,
+                "seconds": round(time.perf_counter() - started, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Mixed read/write load benchmark with a JSON baseline.
+
+Drives the API with a weighted mix of pipeline, report, search and write
+requests from concurrent clients, and reports latency percentiles, error
+counts and throughput per operation. The target is either the app itself,
+called in-process through ASGI (isolates the application from the network
+and server), or a uvicorn server over HTTP. The server is started here
+unless --url points at a running one.
+
+Seed the database first (benchmarks/generate_data.py), then save a baseline
+and compare later runs against it:
+
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/load_test.py --output base.json
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/load_test.py --compare base.json
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/load_test.py --mode http --workers 2
+
+Writes change the data, so reseed before comparing runs that must be exact.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import date, datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import asgi_client  # noqa: E402
+
+TODAY = date.today()
+
+
+def _month(offset: int) -> tuple[int, int]:
+    index = TODAY.year * 12 + TODAY.month - 1 - offset
+    return index // 12, index % 12 + 1
+
+
+def _pipeline(ids, rng):
+    return "GET", f"/pipeline?limit={rng.choice((100, 500))}", None
+
+
+def _pipeline_filtered(ids, rng):
+    flt = rng.choice(
+        (
+            f"status={rng.choice(('new', 'in_process', 'rejected', 'hired'))}",
+            f"recruiter_id={rng.choice(ids['recruiters'])}",
+            f"client_id={rng.choice(ids['clients'])}",
+        )
+    )
+    return "GET", f"/pipeline?limit=100&{flt}", None
+
+
+def _pipeline_page(ids, rng):
+    return "GET", "/pipeline/page?limit=100", None
+
+
+def _earnings(ids, rng):
+    year, month = _month(rng.randrange(12))
+    return "GET", f"/reports/earnings?year={year}&month={month}", None
+
+
+def _earnings_summary(ids, rng):
+    year, month = _month(rng.randrange(12))
+    return "GET", f"/reports/earnings/summary?year={year}&month={month}", None
+
+
+def _earnings_items(ids, rng):
+    year, month = _month(rng.randrange(12))
+    return "GET", f"/reports/earnings/items?year={year}&month={month}&limit=100", None
+
+
+def _funnel(ids, rng):
+    return "GET", f"/reports/funnel?group_by={rng.choice(('client', 'recruiter'))}", None
+
+
+def _search(ids, rng):
+    term = rng.choice(("ivan", "smi", "anna petrov", "ol"))
+    return "GET", f"/candidates?q={quote(term)}", None
+
+
+def _reference_lists(ids, rng):
+    return "GET", rng.choice(("/clients", "/recruiters", "/vacancies")), None
+
+
+def _update_status(ids, rng):
+    body = {"status": "in_process"}
+    return "PATCH", f"/applications/{rng.choice(ids['applications'])}", body
+
+
+def _add_payment(ids, rng):
+    body = {"paid_date": TODAY.isoformat(), "amount": rng.choice((100, 250, 500))}
+    return "POST", f"/applications/{rng.choice(ids['applications'])}/payments", body
+
+
+def _create_application(ids, rng):
+    body = {
+        "candidate_id": rng.choice(ids["candidates"]),
+        "vacancy_id": rng.choice(ids["vacancies"]),
+        "recruiter_id": rng.choice(ids["recruiters"]),
+        "date_contacted": TODAY.isoformat(),
+        "status": "new",
+    }
+    return "POST", "/applications", body
+
+
+# name: (weight, request factory)
+OPERATIONS = {
+    "pipeline": (20, _pipeline),
+    "pipeline_filtered": (15, _pipeline_filtered),
+    "pipeline_page": (10, _pipeline_page),
+    "earnings": (8, _earnings),
+    "earnings_summary": (8, _earnings_summary),
+    "earnings_items": (6, _earnings_items),
+    "funnel": (5, _funnel),
+    "search": (8, _search),
+    "reference_lists": (8, _reference_lists),
+    "update_status": (6, _update_status),
+    "add_payment": (3, _add_payment),
+    "create_application": (3, _create_application),
+}
+
+
+class InProcess:
+    """Calls the ASGI app on this event loop."""
+
+    def __init__(self):
+        import main
+
+        self.app = main.app
+
+    async def start(self):
+        await self.app.router.startup()
+
+    async def stop(self):
+        await self.app.router.shutdown()
+
+    async def request(self, method: str, path: str, body) -> tuple[int, bytes]:
+        payload = b"" if body is None else json.dumps(body).encode()
+        _, status, content = await asgi_client.request(self.app, method, path, payload)
+        return status, content
+
+
+class OverHTTP:
+    """Raw HTTP/1.1 over asyncio streams, one connection per request."""
+
+    def __init__(self, url: str):
+        host_port = url.split("://", 1)[-1].rstrip("/")
+        self.host, _, port = host_port.partition(":")
+        self.port = int(port or 80)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def request(self, method: str, path: str, body) -> tuple[int, bytes]:
+        payload = b"" if body is None else json.dumps(body).encode()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: close\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+            + payload
+        )
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b"\r\n\r\n")
+        return int(head.split(b" ", 2)[1]), content
+
+
+async def discover(target) -> dict[str, list[int]]:
+    """Ids to build requests from, read through the API itself."""
+
+    async def get(path):
+        status, content = await target.request("GET", path, None)
+        if status != 200:
+            raise RuntimeError(f"GET {path} returned {status}")
+        return json.loads(content)
+
+    pipeline = await get("/pipeline?limit=2000")
+    ids = {
+        "clients": [c["id"] for c in await get("/clients")],
+        "recruiters": [r["id"] for r in await get("/recruiters")],
+        "vacancies": [v["id"] for v in await get("/vacancies")],
+        "applications": [row["id"] for row in pipeline],
+        "candidates": [row["candidate_id"] for row in pipeline],
+    }
+    if not all(ids.values()):
+        raise RuntimeError("The database is empty; seed it with benchmarks/generate_data.py")
+    return ids
+
+
+async def run_load(target, args) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    ids = await discover(target)
+    rng = random.Random(args.seed)
+    names = list(OPERATIONS)
+    weights = [OPERATIONS[name][0] for name in names]
+    plan = rng.choices(names, weights, k=args.requests)
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = dict.fromkeys(names, 0)
+    queue = iter(plan)
+
+    async def worker(worker_id: int):
+        worker_rng = random.Random(args.seed * 1000 + worker_id)
+        for name in queue:
+            method, path, body = OPERATIONS[name][1](ids, worker_rng)
+            started = time.perf_counter()
+            try:
+                status, _ = await target.request(method, path, body)
+            except Exception:
+                status = 599
+            latencies[name].append(time.perf_counter() - started)
+            if status >= 400:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarize(samples: list[float], errors: int, elapsed: float) -> dict:
+    if not samples:
+        return {"requests": 0, "errors": errors}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + "/health")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def benchmark(args) -> dict:
+    server = None
+    if args.mode == "http" and not args.url:
+        args.url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--port", str(args.port),
+                "--workers", str(args.workers),
+                "--log-level", "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=dict(os.environ),
+        )
+        _wait_ready(args.url)
+    target = InProcess() if args.mode == "inprocess" else OverHTTP(args.url)
+    await target.start()
+    try:
+        latencies, errors, elapsed = await run_load(target, args)
+    finally:
+        await target.stop()
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    all_samples = [s for samples in latencies.values() for s in samples]
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "http" else None,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+            "db_async": os.getenv("DB_ASYNC", "0") == "1",
+        },
+        "total": summarize(all_samples, sum(errors.values()), elapsed),
+        "operations": {
+            name: summarize(samples, errors[name], elapsed)
+            for name, samples in latencies.items()
+        },
+    }
+
+
+def compare(baseline: dict, current: dict) -> str:
+    """Per-operation table of p50/p95/p99 and throughput changes in percent."""
+
+    def delta(old, new):
+        if not old or new is None:
+            return "    n/a"
+        return f"{(new - old) / old * 100:+6.1f}%"
+
+    lines = [
+        f"baseline {baseline['meta'].get('commit')} -> current {current['meta'].get('commit')}",
+        f"{'operation':<20} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8}",
+    ]
+    rows = {"total": (baseline["total"], current["total"])}
+    for name, stats in current["operations"].items():
+        rows[name] = (baseline["operations"].get(name, {}), stats)
+    for name, (old, new) in rows.items():
+        lines.append(
+            f"{name:<20} "
+            + " ".join(
+                f"{delta(old.get(key), new.get(key)):>8}"
+                for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+            )
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=18800)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (http mode)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args()
+    if args.url:
+        args.mode = "http"
+
+    results = asyncio.run(benchmark(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    if args.compare:
+        print(compare(json.loads(Path(args.compare).read_text()), results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Per-row serialization cost of the pipeline and earnings endpoints.
+
+Compares the model path (one pydantic model per row, re-validated by
+FastAPI against the `response_model` and then JSON-encoded) with the fast
+path in serialization.py (rows written straight to JSON). Both paths start
+from the same fetched rows, so database time is excluded. A temporary
+SQLite database is seeded in-process.
+
+Run from the backend directory:
+
+    python benchmarks/serialization.py --rows 2000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def seed(db, rows: int) -> None:
+    from models import Application, Candidate, Client, Payment, Recruiter, Vacancy
+
+    client = Client(name="Bench Client")
+    recruiter = Recruiter(name="Bench Recruiter")
+    vacancy = Vacancy(client=client, title="Engineer", fee_amount=1000)
+    db.add_all([client, recruiter, vacancy])
+    db.flush()
+    start = date(2024, 1, 1)
+    for i in range(rows):
+        candidate = Candidate(full_name=f"Candidate {i}")
+        paid_date = start + timedelta(days=i % 28)
+        application = Application(
+            candidate=candidate,
+            vacancy_id=vacancy.id,
+            recruiter_id=recruiter.id,
+            date_contacted=start,
+            status="hired",
+            start_date=start,
+            paid=True,
+            paid_date=paid_date,
+            payment_amount=1000,
+        )
+        application.payments.append(Payment(paid_date=paid_date, amount=1000))
+        db.add(application)
+    db.commit()
+
+
+def model_path(rows, schema, response_model) -> bytes:
+    """What the endpoints did before: build models, let FastAPI validate and encode."""
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+
+    field = create_model_field(name="response", type_=response_model, mode="serialization")
+    content = [schema(**row._asdict()) for row in rows]
+    encoded = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(encoded).body
+
+
+def fast_path(rows) -> bytes:
+    from serialization import json_response, row_dicts
+
+    return json_response(row_dicts(rows)).body
+
+
+def measure(fn, repeat: int, rows: int) -> float:
+    """Mean microseconds per row."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat / rows * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import migrations
+    from database import SessionLocal, engine
+    from queries import build_pipeline_query, earnings_items_query
+    from schemas import ApplicationRow, EarningsItem
+
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        seed(db, args.rows)
+        cases = {
+            "pipeline": (db.execute(build_pipeline_query()).all(), ApplicationRow),
+            "earnings": (db.execute(earnings_items_query()).all(), EarningsItem),
+        }
+
+    results = []
+    for name, (rows, schema) in cases.items():
+        before = model_path(rows, schema, list[schema])
+        after = fast_path(rows)
+        if json.loads(before) != json.loads(after):
+            raise RuntimeError(f"{name}: fast path output differs from the model path")
+        model_us = measure(lambda: model_path(rows, schema, list[schema]), args.repeat, len(rows))
+        fast_us = measure(lambda: fast_path(rows), args.repeat, len(rows))
+        results.append(
+            {
+                "endpoint": name,
+                "rows": len(rows),
+                "model_us_per_row": round(model_us, 2),
+                "fast_us_per_row": round(fast_us, 2),
+                "speedup": round(model_us / fast_us, 1),
+            }
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+One-time database bootstrap and the startup schema check.
+
+`run` does everything a database needs before the API can serve it: schema
+migrations, the full-text search index, the initial clients for an empty
+database and the backfill of the earnings rollup and funnel counters. It is
+what `python manage.py bootstrap` runs, e.g. as a release step.
+
+`prepare` is the serving path. It only reads the schema version, and runs
+the bootstrap when the database is new or behind, unless
+`DB_AUTO_BOOTSTRAP=0`, in which case it refuses to start instead. On an
+up-to-date database no DDL statements are issued at startup.
+"""
+
+import logging
+import os
+
+from sqlalchemy import Engine, exists, select
+
+from database import SessionLocal
+from models import Client
+import earnings_rollup
+import migrations
+import pipeline_stats
+import read_model
+import search_index
+
+AUTO_BOOTSTRAP = os.getenv("DB_AUTO_BOOTSTRAP", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CLIENTS = ("Client A", "Client B", "Client C")
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+def seed_initial_clients() -> None:
+    db = SessionLocal()
+    try:
+        if not db.scalar(select(exists().select_from(Client))):
+            db.add_all([Client(name=name) for name in INITIAL_CLIENTS])
+            db.commit()
+    finally:
+        db.close()
+
+
+def backfill() -> None:
+    """Build the rollup, counters and read model for databases that predate them."""
+    db = SessionLocal()
+    try:
+        earnings_rollup.ensure_populated(db)
+        pipeline_stats.ensure_populated(db)
+        read_model.ensure_populated(db)
+    finally:
+        db.close()
+
+
+def run(engine: Engine) -> list[int]:
+    """Bring the database fully up to date. Returns the applied migrations."""
+    applied = migrations.upgrade(engine)
+    search_index.install(engine)
+    seed_initial_clients()
+    backfill()
+    return applied
+
+
+def prepare(engine: Engine) -> None:
+    """Check the schema before serving; bootstrap it if allowed and needed."""
+    with engine.connect() as conn:
+        version = migrations.current_version(conn)
+    if version >= migrations.LATEST:
+        search_index.detect(engine)
+        return
+    if not AUTO_BOOTSTRAP:
+        raise SchemaOutdated(
+            f"Database schema is at version {version}, expected {migrations.LATEST}; "
+            "run `python manage.py bootstrap`"
+        )
+    applied = run(engine)
+    logger.info("Bootstrapped database schema from version %s (applied %s)", version, applied)
@@ -0,0 +1,232 @@
+"""
+Streaming bulk import of candidates and applications from CSV or JSONL.
+
+Records are parsed lazily from a text stream and processed in fixed-size
+batches: each batch is validated, checked against the referenced tables and
+inserted with one executemany per table in a single transaction. Only one
+batch is held in memory at a time, so memory use does not depend on the size
+of the file. Rows that fail validation are skipped and reported by their
+1-based record number.
+"""
+
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, TextIO
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import change_feed
+import earnings_rollup
+import pipeline_stats
+import read_model
+from models import Application, Candidate, Payment, Recruiter, Vacancy
+from schemas import ApplicationCreate, CandidateCreate
+from validation import StatusRules
+
+FORMATS = ("csv", "jsonl")
+BATCH_SIZE = 1000
+# Per-row errors kept in the report; the failed count is always exact
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def fail(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+
+def detect_format(filename: str | None, fmt: str | None) -> str:
+    """Pick the input format from an explicit value or the file extension."""
+    if fmt is None and filename:
+        suffix = filename.rsplit(".", 1)[-1].lower()
+        fmt = "jsonl" if suffix in ("jsonl", "ndjson") else suffix
+    if fmt not in FORMATS:
+        raise HTTPException(400, "format must be 'csv' or 'jsonl'")
+    return fmt
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[tuple[int, dict | str]]:
+    """
+    Yield `(row number, record)` pairs. Unparseable JSON lines are yielded
+    as an error string instead of a dict. Empty CSV cells are dropped so the
+    schema defaults apply.
+    """
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, {k: v for k, v in record.items() if k and v not in ("", None)}
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, f"Invalid JSON: {exc}"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def _batches(records: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def _parse(batch, schema, result: ImportResult) -> list[tuple[int, object]]:
+    parsed = []
+    for number, record in batch:
+        if isinstance(record, str):
+            result.fail(number, record)
+            continue
+        try:
+            parsed.append((number, schema.model_validate(record)))
+        except ValidationError as exc:
+            result.fail(number, _validation_message(exc))
+    return parsed
+
+
+def _insert_batch(db: Session, rows: list[tuple[int, object]], result: ImportResult, write) -> None:
+    """Run `write` for a validated batch in one transaction."""
+    if not rows:
+        return
+    try:
+        write()
+        db.commit()
+        result.inserted += len(rows)
+    except SQLAlchemyError as exc:
+        db.rollback()
+        message = f"Batch rejected by the database: {exc.__class__.__name__}"
+        for number, _ in rows:
+            result.fail(number, message)
+
+
+def import_candidates(
+    db: Session, records: Iterable, batch_size: int = BATCH_SIZE
+) -> ImportResult:
+    result = ImportResult()
+    for batch in _batches(records, batch_size):
+        rows = _parse(batch, CandidateCreate, result)
+        _insert_batch(
+            db,
+            rows,
+            result,
+            lambda: db.execute(insert(Candidate), [p.model_dump() for _, p in rows]),
+        )
+    return result
+
+
+def import_applications(
+    db: Session, records: Iterable, batch_size: int = BATCH_SIZE
+) -> ImportResult:
+    """
+    Import applications, including the optional initial payment that
+    `create_application` supports. Vacancies and recruiters are preloaded;
+    candidate and replaced-application ids are checked with one query per
+    batch since those tables can be very large.
+    """
+    result = ImportResult()
+    fees = dict(db.execute(select(Vacancy.id, Vacancy.fee_amount)).tuples().all())
+    recruiter_ids = set(db.scalars(select(Recruiter.id)))
+    rules = StatusRules()
+
+    for batch in _batches(records, batch_size):
+        parsed = _parse(batch, ApplicationCreate, result)
+        candidate_ids = set(
+            db.scalars(
+                select(Candidate.id).where(
+                    Candidate.id.in_({p.candidate_id for _, p in parsed})
+                )
+            )
+        )
+        replaced = {p.replacement_of_id for _, p in parsed if p.replacement_of_id is not None}
+        replaced_ids = (
+            set(db.scalars(select(Application.id).where(Application.id.in_(replaced))))
+            if replaced
+            else set()
+        )
+
+        rows: list[tuple[int, ApplicationCreate]] = []
+        for number, p in parsed:
+            if p.candidate_id not in candidate_ids:
+                result.fail(number, "Candidate not found")
+            elif p.vacancy_id not in fees:
+                result.fail(number, "Vacancy not found")
+            elif p.recruiter_id not in recruiter_ids:
+                result.fail(number, "Recruiter not found")
+            elif p.replacement_of_id is not None and p.replacement_of_id not in replaced_ids:
+                result.fail(number, "Replaced application not found")
+            elif error := rules.error(p.status, p.rejection_date, p.start_date):
+                result.fail(number, error)
+            else:
+                rows.append((number, p))
+
+        def write():
+            values = []
+            for _, p in rows:
+                data = p.model_dump()
+                amount = 0.0
+                if p.paid and p.paid_date:
+                    amount = float(
+                        p.payment_amount
+                        if p.payment_amount and p.payment_amount > 0
+                        else fees[p.vacancy_id] or 0.0
+                    )
+                data["payment_amount"] = round(amount, 2)
+                data["paid"] = data["payment_amount"] > 0
+                data["paid_date"] = p.paid_date if p.paid and p.paid_date else None
+                values.append(data)
+
+            ids = db.scalars(
+                insert(Application).returning(Application.id, sort_by_parameter_order=True),
+                values,
+            ).all()
+            pipeline_stats.apply(db, Application.id.in_(ids))
+            payments = [
+                {
+                    "application_id": app_id,
+                    "paid_date": p.paid_date,
+                    "amount": data["payment_amount"],
+                    "note": "initial payment",
+                }
+                for app_id, (_, p), data in zip(ids, rows, values)
+                if p.paid and p.paid_date
+            ]
+            if payments:
+                db.execute(insert(Payment), payments)
+                paid_ids = [payment["application_id"] for payment in payments]
+                earnings_rollup.apply(db, Payment.application_id.in_(paid_ids))
+            read_model.refresh(db, Application.id.in_(ids))
+            change_feed.record(db, Application.id.in_(ids))
+
+        _insert_batch(db, rows, result, write)
+    return result
+
+
+IMPORTERS = {
+    "candidates": import_candidates,
+    "applications": import_applications,
+}
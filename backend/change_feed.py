@@ -0,0 +1,413 @@
+"""
+Pipeline change feed.
+
+Write paths call `record` in the same transaction as their changes, adding
+one `ChangeLog` entry per affected application, like the funnel counters.
+GET /pipeline/stream serves the log as Server-Sent Events:
+
+* One poller per process reads new entries (woken right away by commits in
+  this process, every CHANGE_FEED_POLL_MS otherwise), loads the changed rows
+  in `ApplicationRow` shape with a single query and fans them out to every
+  subscriber whose client/recruiter filter matches. Database load therefore
+  grows with the number of processes, not with the number of open tabs.
+* A subscriber that passes `since` (or reconnects with Last-Event-ID) first
+  catches up from the log, receiving the current row of each application
+  changed since then, and continues live. A subscriber that falls too far
+  behind the live feed catches up from the log the same way.
+
+Events: `upsert` (an ApplicationRow), `delete` ({"id": ...}), `ready` once
+caught up (its id is the position to resume from) and `reset` when the log
+no longer reaches back to `since`, or the gap is larger than reloading; the
+client then reloads /pipeline and subscribes without `since`.
+
+GET /pipeline/changes serves the same log for polling clients: each request
+returns the rows changed since a token (a sequence number), tombstones for
+deleted applications and the next token.
+
+Entries older than CHANGE_LOG_RETENTION_HOURS (default 72) are pruned by the
+poller and by `python manage.py prune-changes`.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, NamedTuple
+
+from pydantic_core import to_json
+from sqlalchemy import DateTime, delete, event, func, insert, literal, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import IS_SQLITE, SessionLocal
+from models import Application, ChangeLog, Vacancy
+from queries import build_pipeline_query
+
+POLL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_MS", "500")) / 1000
+RETENTION = timedelta(hours=float(os.getenv("CHANGE_LOG_RETENTION_HOURS", "72")))
+PRUNE_EVERY_SECONDS = 600
+KEEPALIVE_SECONDS = 15
+
+# Log entries read per query
+BATCH_SIZE = 1000
+# Events buffered per subscriber before it falls back to reading the log
+QUEUE_SIZE = 1000
+# Beyond this many changed applications a reload is cheaper than catching up
+CATCH_UP_LIMIT = 10_000
+
+# Serializes change log writers on PostgreSQL, so sequence numbers become
+# visible in commit order and a reader never skips a later-committed lower
+# number. SQLite has a single writer anyway.
+_PG_LOCK_KEY = 0x53524D01
+
+_KEY = "change_feed_written"
+
+logger = logging.getLogger(__name__)
+
+
+def record(db: Session, *criteria, op: str = ChangeLog.UPSERT) -> None:
+    """
+    Log the applications matching `criteria` as changed (upsert) or deleted.
+    Call it after changes are flushed, and before deletions, within the same
+    transaction. Criteria may refer to Application and Vacancy columns.
+    """
+    if not IS_SQLITE:
+        db.execute(select(func.pg_advisory_xact_lock(_PG_LOCK_KEY)))
+    changed = (
+        select(
+            Application.id,
+            Vacancy.client_id,
+            Application.recruiter_id,
+            literal(op),
+            literal(datetime.utcnow(), DateTime),
+        )
+        .join(Vacancy, Vacancy.id == Application.vacancy_id)
+        .where(*criteria)
+        .order_by(Application.id)
+    )
+    db.execute(
+        insert(ChangeLog).from_select(
+            ["application_id", "client_id", "recruiter_id", "op", "created_at"], changed
+        )
+    )
+    db.info[_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_KEY, False):
+        feed.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_KEY, None)
+
+
+class Change(NamedTuple):
+    seq: int
+    op: str
+    application_id: int
+    client_id: int
+    recruiter_id: int
+    # ApplicationRow fields for upserts
+    row: dict | None
+
+    def matches(self, client_id: int | None, recruiter_id: int | None) -> bool:
+        return (client_id is None or self.client_id == client_id) and (
+            recruiter_id is None or self.recruiter_id == recruiter_id
+        )
+
+    def encode(self) -> bytes:
+        data = self.row if self.op == ChangeLog.UPSERT else {"id": self.application_id}
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (self.seq, self.op.encode(), to_json(data))
+
+
+def _head(db: Session) -> int:
+    return db.scalar(select(func.max(ChangeLog.seq))) or 0
+
+
+def _entries(db: Session, after: int, client_id=None, recruiter_id=None):
+    stmt = select(
+        ChangeLog.seq,
+        ChangeLog.op,
+        ChangeLog.application_id,
+        ChangeLog.client_id,
+        ChangeLog.recruiter_id,
+    ).where(ChangeLog.seq > after)
+    if client_id is not None:
+        stmt = stmt.where(ChangeLog.client_id == client_id)
+    if recruiter_id is not None:
+        stmt = stmt.where(ChangeLog.recruiter_id == recruiter_id)
+    return db.execute(stmt.order_by(ChangeLog.seq).limit(BATCH_SIZE)).all()
+
+
+def _changes(db: Session, entries) -> list[Change]:
+    """Changes for log entries, with the current row of every upserted application."""
+    ids = {entry.application_id for entry in entries if entry.op == ChangeLog.UPSERT}
+    rows = {}
+    if ids:
+        stmt = build_pipeline_query().where(Application.id.in_(ids)).order_by(None)
+        rows = {row.id: row._asdict() for row in db.execute(stmt)}
+    changes = []
+    for entry in entries:
+        row = rows.get(entry.application_id) if entry.op == ChangeLog.UPSERT else None
+        if entry.op == ChangeLog.UPSERT and row is None:
+            # Deleted since; its delete entry follows
+            continue
+        changes.append(Change(*entry, row))
+    return changes
+
+
+def head() -> int:
+    """The newest sequence number, 0 for an empty log."""
+    db = SessionLocal()
+    try:
+        return _head(db)
+    finally:
+        db.close()
+
+
+def read_after(after: int) -> tuple[list[Change], int, bool]:
+    """The next batch of changes after `after`, the position reached and whether more follow."""
+    db = SessionLocal()
+    try:
+        entries = _entries(db, after)
+        changes = _changes(db, entries)
+    finally:
+        db.close()
+    reached = entries[-1].seq if entries else after
+    return changes, reached, len(entries) == BATCH_SIZE
+
+
+def _collapse(db: Session, since: int, client_id, recruiter_id, limit: int):
+    """
+    The latest log entry per application after `since`, in log order, for at
+    most `limit` applications; the position reached and whether more follow.
+    None when the log no longer reaches back to `since`.
+    """
+    oldest, newest = db.execute(select(func.min(ChangeLog.seq), func.max(ChangeLog.seq))).one()
+    newest = newest or 0
+    # The newest entry is never pruned, so a gap below `oldest` means pruning
+    if since > newest or (oldest is not None and since < oldest - 1):
+        return None
+    latest = {}
+    after = since
+    while True:
+        entries = _entries(db, after, client_id, recruiter_id)
+        for entry in entries:
+            if entry.application_id not in latest and len(latest) == limit:
+                return list(latest.values()), after, True
+            latest.pop(entry.application_id, None)
+            latest[entry.application_id] = entry
+            after = entry.seq
+        if len(entries) < BATCH_SIZE:
+            # Entries filtered out up to `newest` need not be read again
+            return list(latest.values()), max(newest, after), False
+
+
+def catch_up(
+    since: int, client_id: int | None = None, recruiter_id: int | None = None
+) -> tuple[list[Change], int] | None:
+    """
+    Changes after `since` matching the filters, collapsed to the latest per
+    application, and the position they reach. None when the log no longer
+    reaches back to `since` or a reload would be cheaper.
+    """
+    db = SessionLocal()
+    try:
+        collapsed = _collapse(db, since, client_id, recruiter_id, CATCH_UP_LIMIT)
+        if collapsed is None or collapsed[2]:
+            return None
+        entries, reached, _ = collapsed
+        return _changes(db, entries), reached
+    finally:
+        db.close()
+
+
+def changes_since(
+    db: Session,
+    since: int | None,
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    limit: int = BATCH_SIZE,
+) -> dict:
+    """
+    One page of delta sync: the current rows of applications changed after
+    `since`, ids deleted since, the token to continue from and whether more
+    follow. Without `since`, or when the log no longer reaches back to it,
+    `reset` asks the caller to reload the pipeline and continue from `token`.
+    """
+    collapsed = None if since is None else _collapse(db, since, client_id, recruiter_id, limit)
+    if collapsed is None:
+        return {"changes": [], "deleted": [], "token": _head(db), "has_more": False, "reset": True}
+    entries, token, has_more = collapsed
+    changes = _changes(db, entries)
+    return {
+        "changes": [change.row for change in changes if change.op == ChangeLog.UPSERT],
+        "deleted": [change.application_id for change in changes if change.op == ChangeLog.DELETE],
+        "token": token,
+        "has_more": has_more,
+        "reset": False,
+    }
+
+
+def prune() -> int:
+    """Delete entries older than the retention period, always keeping the newest one."""
+    cutoff = datetime.utcnow() - RETENTION
+    db = SessionLocal()
+    try:
+        newest = select(func.max(ChangeLog.seq)).scalar_subquery()
+        result = db.execute(
+            delete(ChangeLog).where(ChangeLog.created_at < cutoff, ChangeLog.seq < newest)
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def _event(name: str, seq: int) -> bytes:
+    return b'id: %d\nevent: %s\ndata: {"seq": %d}\n\n' % (seq, name.encode(), seq)
+
+
+RESET = b"event: reset\ndata: {}\n\n"
+
+
+class Subscriber:
+    def __init__(self, client_id: int | None, recruiter_id: int | None):
+        self.client_id = client_id
+        self.recruiter_id = recruiter_id
+        # None in the queue means "fell behind, catch up from the log"
+        self.queue: asyncio.Queue[Change | None] = asyncio.Queue(QUEUE_SIZE)
+        self.lagged = False
+
+    def offer(self, change: Change) -> None:
+        if self.lagged or not change.matches(self.client_id, self.recruiter_id):
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Feed:
+    """The per-process poller and its subscribers."""
+
+    def __init__(self):
+        self.subscribers: set[Subscriber] = set()
+        # Sequence number up to which changes were handed to subscribers
+        self.position = 0
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._pruned_at = 0.0
+
+    def wake(self) -> None:
+        """Poll now; called from any thread after a commit that logged changes."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            # The loop has been closed
+            pass
+
+    def _subscribe(self, subscriber: Subscriber, start: int) -> int:
+        """Register `subscriber`; returns the position live delivery continues from."""
+        self.subscribers.add(subscriber)
+        if self._task is None:
+            self.position = start
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return self.position
+
+    async def _run(self) -> None:
+        try:
+            while self.subscribers:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    await self._poll()
+                except Exception:
+                    logger.exception("Change feed poll failed")
+        finally:
+            self._task = None
+
+    async def _poll(self) -> None:
+        more = True
+        while more and self.subscribers:
+            changes, self.position, more = await run_in_threadpool(read_after, self.position)
+            for change in changes:
+                for subscriber in self.subscribers:
+                    subscriber.offer(change)
+        if time.monotonic() - self._pruned_at > PRUNE_EVERY_SECONDS:
+            self._pruned_at = time.monotonic()
+            await run_in_threadpool(prune)
+
+    async def stream(
+        self,
+        since: int | None,
+        client_id: int | None = None,
+        recruiter_id: int | None = None,
+        follow: bool = True,
+    ) -> AsyncIterator[bytes]:
+        """Server-Sent Events for one subscriber; ends after catching up unless `follow`."""
+        yield b"retry: 3000\n\n"
+        subscriber = Subscriber(client_id, recruiter_id)
+        try:
+            start = await run_in_threadpool(head)
+            if follow:
+                # Live delivery covers everything after `position`; the log
+                # covers the rest, including what the poller handed out
+                # before this subscriber registered
+                position = self._subscribe(subscriber, start)
+                if since is None and position > start:
+                    since = start
+            if since is None:
+                sent = start
+            else:
+                caught_up = await run_in_threadpool(catch_up, since, client_id, recruiter_id)
+                if caught_up is None:
+                    yield RESET
+                    return
+                changes, sent = caught_up
+                for change in changes:
+                    yield change.encode()
+            yield _event("ready", sent)
+            if not follow:
+                return
+
+            while True:
+                try:
+                    change = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if change is None:
+                    subscriber.lagged = False
+                    caught_up = await run_in_threadpool(catch_up, sent, client_id, recruiter_id)
+                    if caught_up is None:
+                        yield RESET
+                        return
+                    changes, reached = caught_up
+                    for change in changes:
+                        yield change.encode()
+                    sent = max(sent, reached)
+                elif change.seq > sent:
+                    yield change.encode()
+                    sent = change.seq
+        finally:
+            self.subscribers.discard(subscriber)
+
+
+feed = Feed()
@@ -0,0 +1,132 @@
+"""
+Per-table data versions and ETags.
+
+Session event hooks record which tables a transaction wrote to, through
+ORM flushes as well as bulk `insert`/`update`/`delete` statements, and bump
+their counters in the `data_versions` table right before the commit. The
+counters live in the database so all workers agree on them.
+
+An ETag is a hash of the request URL and the versions of every table the
+resource is built from. If none of those tables changed, the ETag still
+matches and the endpoint can answer 304 without running its query.
+"""
+
+import hashlib
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from database import upsert
+from models import DataVersion, IdempotencyKey, Job
+
+# Bump when the JSON shape of responses changes, so cached ETags from an
+# older deployment never match
+FORMAT_VERSION = 1
+
+# Writes to a table can also change rows of these tables through ORM
+# cascades, triggers or cached columns
+DEPENDENTS = {
+    "clients": {"vacancies", "applications", "payments", "earnings_rollup"},
+    "vacancies": {"applications", "payments", "earnings_rollup"},
+    "candidates": {"applications", "payments"},
+    "applications": {"payments", "earnings_rollup"},
+    "payments": {"applications", "earnings_rollup"},
+}
+
+# Job and idempotency bookkeeping backs no cached resource
+_UNTRACKED = {DataVersion.__tablename__, Job.__tablename__, IdempotencyKey.__tablename__}
+_KEY = "written_tables"
+# Versions already read in the current transaction, see `current`
+_READ_KEY = "read_versions"
+
+
+def _written(session: Session) -> set[str]:
+    return session.info.setdefault(_KEY, set())
+
+
+def _record(session: Session, table_name: str) -> None:
+    if table_name in _UNTRACKED:
+        return
+    written = _written(session)
+    written.add(table_name)
+    written.update(DEPENDENTS.get(table_name, ()))
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            _record(session, table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        _record(state.session, state.statement.table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    # Flush first so writes pending in the unit of work are recorded too
+    session.flush()
+    written = session.info.pop(_KEY, None)
+    if not written:
+        return
+    stmt = upsert(DataVersion).values([{"table_name": name, "version": 1} for name in sorted(written)])
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["table_name"],
+            set_={"version": DataVersion.version + 1},
+        )
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    session.info.pop(_READ_KEY, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_KEY, None)
+    session.info.pop(_READ_KEY, None)
+
+
+def versions(db: Session, tables: tuple[str, ...]) -> dict[str, int]:
+    """Current versions of `tables`; tables never written to are at 0."""
+    found = dict(
+        db.execute(
+            select(DataVersion.table_name, DataVersion.version).where(
+                DataVersion.table_name.in_(tables)
+            )
+        ).tuples().all()
+    )
+    current = {name: found.get(name, 0) for name in tables}
+    db.info.setdefault(_READ_KEY, {}).update(current)
+    return current
+
+
+def current(db: Session, table: str) -> int:
+    """
+    Version of `table`, reusing the value `versions` already read in this
+    transaction (by the ETag check of the same request) when there is one.
+    """
+    read = db.info.get(_READ_KEY, {})
+    return read[table] if table in read else versions(db, (table,))[table]
+
+
+def etag(url: str, db: Session, tables: tuple[str, ...]) -> str:
+    """Strong ETag for the resource at `url` built from `tables`."""
+    current = versions(db, tables)
+    state = f"{FORMAT_VERSION}|{url}|" + ",".join(f"{t}={current[t]}" for t in sorted(current))
+    return '"' + hashlib.sha1(state.encode()).hexdigest() + '"'
+
+
+def matches(if_none_match: str | None, current: str) -> bool:
+    """Evaluate an If-None-Match header against the current ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison
+    return "*" in candidates or current in (tag.removeprefix("W/") for tag in candidates)
@@ -0,0 +1,81 @@
+"""
+Maintenance of the monthly earnings rollup.
+
+`EarningsRollup` holds one row per (year, month, client, recruiter) with the
+sum and count of payments in that month. Every write path that creates or
+removes payments calls `apply` in its own transaction, so report endpoints
+can read month totals, breakdowns and trends from the rollup instead of
+joining and scanning the payments table.
+"""
+
+from sqlalchemy import delete, exists, extract, func, select
+from sqlalchemy.orm import Session
+
+from database import round_money, upsert
+from models import Application, EarningsRollup, Payment, Vacancy
+
+
+def _grouped_payments(*criteria):
+    """Payment sums grouped by rollup key for payments matching `criteria`."""
+    year = extract("year", Payment.paid_date)
+    month = extract("month", Payment.paid_date)
+    return (
+        select(
+            year.label("year"),
+            month.label("month"),
+            Vacancy.client_id,
+            Application.recruiter_id,
+            func.sum(Payment.amount).label("total"),
+            func.count(Payment.id).label("payment_count"),
+        )
+        .join(Application, Application.id == Payment.application_id)
+        .join(Vacancy, Vacancy.id == Application.vacancy_id)
+        .where(*criteria)
+        .group_by(year, month, Vacancy.client_id, Application.recruiter_id)
+    )
+
+
+def apply(db: Session, *criteria, sign: int = 1) -> None:
+    """
+    Add (sign=1) or subtract (sign=-1) the payments matching `criteria` to the
+    rollup. Call it after new payments are flushed, or before payments are
+    deleted, within the same transaction. Criteria may refer to Payment,
+    Application and Vacancy columns.
+    """
+    groups = db.execute(_grouped_payments(*criteria)).all()
+    for group in groups:
+        stmt = upsert(EarningsRollup).values(
+            year=int(group.year),
+            month=int(group.month),
+            client_id=group.client_id,
+            recruiter_id=group.recruiter_id,
+            total=round(sign * float(group.total or 0.0), 2),
+            payment_count=sign * group.payment_count,
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["year", "month", "client_id", "recruiter_id"],
+                set_={
+                    "total": round_money(EarningsRollup.total + stmt.excluded.total),
+                    "payment_count": EarningsRollup.payment_count
+                    + stmt.excluded.payment_count,
+                },
+            )
+        )
+    if sign < 0 and groups:
+        db.execute(delete(EarningsRollup).where(EarningsRollup.payment_count <= 0))
+
+
+def rebuild(db: Session) -> None:
+    """Recompute the whole rollup from the payments table."""
+    db.execute(delete(EarningsRollup))
+    apply(db)
+    db.commit()
+
+
+def ensure_populated(db: Session) -> None:
+    """Build the rollup once for databases that had payments before it existed."""
+    if db.scalar(select(exists().select_from(EarningsRollup))):
+        return
+    if db.scalar(select(exists().select_from(Payment))):
+        rebuild(db)
@@ -0,0 +1,73 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are read from a server-side cursor (`yield_per`) and written to the
+response in chunks, so an export of any size is served in constant memory.
+Each export opens its own session because the response body is produced
+after the endpoint (and its request-scoped session) has returned.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from database import SessionLocal
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+# Rows fetched from the cursor and written per chunk
+CHUNK_ROWS = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_chunks(result) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    for partition in result.partitions():
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(result) -> Iterator[str]:
+    keys = list(result.keys())
+    for partition in result.partitions():
+        yield "".join(
+            json.dumps(dict(zip(keys, row)), default=_json_default, ensure_ascii=False) + "\n"
+            for row in partition
+        )
+
+
+def _rows(stmt: Select, fmt: str) -> Iterator[str]:
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=CHUNK_ROWS))
+        chunks = _csv_chunks(result) if fmt == "csv" else _ndjson_chunks(result)
+        yield from chunks
+    finally:
+        db.close()
+
+
+def stream_export(stmt: Select, fmt: str, name: str) -> StreamingResponse:
+    """Stream the rows of `stmt` as a CSV or NDJSON attachment."""
+    if fmt not in FORMATS:
+        raise HTTPException(400, "format must be 'csv' or 'ndjson'")
+    return StreamingResponse(
+        _rows(stmt, fmt),
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
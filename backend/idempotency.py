@@ -0,0 +1,192 @@
+"""
+Idempotency-Key support for create requests.
+
+Clients that may retry a write (flaky connections, timeouts) send the same
+`Idempotency-Key` header with every attempt. The first request claims the
+key by inserting a row into `idempotency_keys` in a transaction of its own.
+The endpoint stores its response in that row with `complete`, in the same
+transaction as its writes, so a write is committed together with its stored
+response or not at all. Later requests with the same key:
+
+* are answered from the stored response with `Idempotent-Replayed: true`,
+  without running the endpoint;
+* wait while the first request is still in flight and then get its
+  response, so concurrent duplicates collapse onto one execution, across
+  worker processes too;
+* get 422 when they send a different body, or target a different resource
+  of the same route (another `app_id`), under the same key.
+
+When the first request fails, its claim is released and a retry runs the
+endpoint again. A claim that has not completed within IN_FLIGHT_SECONDS is
+treated as abandoned. Keys expire after IDEMPOTENCY_TTL_HOURS (default 24).
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import IdempotencyKey
+
+TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+IN_FLIGHT_SECONDS = 60
+# How long a duplicate waits for the first request before giving up with 409
+WAIT_SECONDS = 10
+POLL_SECONDS = 0.05
+PRUNE_EVERY_SECONDS = 600
+MAX_KEY_LENGTH = 255
+
+_pruned_at = 0.0
+
+
+class Replay(Exception):
+    """Raised to answer a request with the stored response of its key."""
+
+    def __init__(self, status_code: int, body: str):
+        self.status_code = status_code
+        self.body = body
+
+
+@dataclass
+class Claim:
+    route: str
+    key: str
+    token: str
+    completed: bool = False
+
+    def where(self):
+        return (
+            IdempotencyKey.route == self.route,
+            IdempotencyKey.key == self.key,
+            IdempotencyKey.token == self.token,
+        )
+
+
+def _try_claim(route: str, key: str, fingerprint: str) -> Claim | None:
+    """
+    Claim the key for this request. Raises Replay when it already completed
+    and returns None while another request holds it.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        claim = Claim(route, key, uuid.uuid4().hex)
+        db.add(
+            IdempotencyKey(
+                route=route,
+                key=key,
+                fingerprint=fingerprint,
+                token=claim.token,
+                created_at=now,
+                expires_at=now + TTL,
+            )
+        )
+        try:
+            db.commit()
+            return claim
+        except IntegrityError:
+            db.rollback()
+
+        row = db.get(IdempotencyKey, (route, key))
+        if row is None:
+            # Released in the meantime
+            return None
+        abandoned = row.status_code is None and (
+            row.created_at < now - timedelta(seconds=IN_FLIGHT_SECONDS)
+        )
+        if row.expires_at <= now or abandoned:
+            db.execute(delete(IdempotencyKey).where(*Claim(route, key, row.token).where()))
+            db.commit()
+            return None
+        if row.fingerprint != fingerprint:
+            raise HTTPException(422, "Idempotency-Key was already used for a different request")
+        if row.status_code is not None:
+            raise Replay(row.status_code, row.body)
+        return None
+    finally:
+        db.close()
+
+
+def release(claim: Claim) -> None:
+    """Give the key up after a failed request, so a retry runs again."""
+    db = SessionLocal()
+    try:
+        db.execute(delete(IdempotencyKey).where(*claim.where()))
+        db.commit()
+    finally:
+        db.close()
+
+
+def complete(db: Session, claim: Claim | None, content: BaseModel, status_code: int = 200) -> None:
+    """Store the response for `claim` in the endpoint's transaction; call it before the commit."""
+    if claim is None:
+        return
+    db.execute(
+        update(IdempotencyKey)
+        .where(*claim.where())
+        .values(status_code=status_code, body=content.model_dump_json())
+    )
+    claim.completed = True
+
+
+def prune() -> int:
+    """Delete expired keys."""
+    db = SessionLocal()
+    try:
+        deleted = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow())
+        ).rowcount
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+async def idempotency_key(request: Request):
+    """
+    Dependency for create endpoints: None without an Idempotency-Key header,
+    otherwise the claim to pass to `complete`. Duplicates of a completed
+    request end here with Replay. Declare it before `get_db`, so the claim of
+    a failed request is released after its session has rolled back.
+    """
+    global _pruned_at
+    key = request.headers.get("idempotency-key")
+    if key is None:
+        yield None
+        return
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+    route = f"{request.method} {request.scope['route'].path}"
+    # The key is scoped by the route template, so the concrete path goes into
+    # the fingerprint: the same key sent for another app_id is a conflict
+    digest = hashlib.sha256(request.url.path.encode() + b"\n")
+    digest.update(await request.body())
+    fingerprint = digest.hexdigest()
+
+    if time.monotonic() - _pruned_at > PRUNE_EVERY_SECONDS:
+        _pruned_at = time.monotonic()
+        await run_in_threadpool(prune)
+    deadline = time.monotonic() + WAIT_SECONDS
+    while (claim := await run_in_threadpool(_try_claim, route, key, fingerprint)) is None:
+        if time.monotonic() > deadline:
+            raise HTTPException(409, "A request with this Idempotency-Key is still in progress")
+        await asyncio.sleep(POLL_SECONDS)
+
+    try:
+        yield claim
+    except Exception:
+        await run_in_threadpool(release, claim)
+        raise
+    if not claim.completed:
+        await run_in_threadpool(release, claim)
@@ -0,0 +1,415 @@
+"""
+Background jobs for heavy maintenance and reporting work.
+
+POST /jobs stores a job in the `jobs` table and returns right away. A
+`Runner` in every serving process claims queued jobs and runs them on its
+own thread pool (JOB_WORKERS threads, default 2, 0 disables it), so at most
+that many jobs run per process however many are submitted, and none of them
+holds a request thread. `python manage.py run-jobs` runs the same runner as
+a separate worker process.
+
+Jobs report progress through their `JobContext`, which raises
+`JobCancelled` at the next progress report once POST /jobs/{id}/cancel was
+called. Queued jobs are cancelled immediately. Workers refresh the heartbeat
+of their running jobs; a job whose heartbeat is older than STALE_SECONDS
+(its worker died) is queued again, which is safe because every job kind is
+idempotent. Finished jobs are deleted after JOB_RETENTION_DAYS (default 7).
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from pydantic_core import to_json
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+import earnings_rollup
+import payment_cache
+import pipeline_stats
+import read_model
+import search_index
+from database import SessionLocal, engine
+from models import Application, Job, Payment, Vacancy
+from queries import earnings_items_query
+from schemas import CheckPaymentsParams, EarningsYearParams
+from serialization import row_dicts
+
+WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+RETENTION = timedelta(days=float(os.getenv("JOB_RETENTION_DAYS", "7")))
+
+# How often the dispatcher looks for jobs submitted by other processes
+POLL_SECONDS = 2.0
+HEARTBEAT_SECONDS = 15
+STALE_SECONDS = 120
+# Applications repaired per transaction (and per progress report)
+REPAIR_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to a running job for progress reports and cancellation checks."""
+
+    def __init__(self, job_id: int, stop: threading.Event | None = None):
+        self.job_id = job_id
+        self._stop = stop
+
+    def progress(self, done: int, total: int | None = None, message: str | None = None) -> None:
+        """Record progress; raises JobCancelled if the job should stop."""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == self.job_id)
+                .values(done=done, total=total, message=message, heartbeat_at=datetime.utcnow())
+            )
+            cancel = db.scalar(select(Job.cancel_requested).where(Job.id == self.job_id))
+            db.commit()
+        finally:
+            db.close()
+        if cancel or (self._stop is not None and self._stop.is_set()):
+            raise JobCancelled()
+
+
+@dataclass
+class JobKind:
+    run: Callable[[JobContext, Any], dict | None]
+    params: type[BaseModel] | None
+
+
+KINDS: dict[str, JobKind] = {}
+
+
+def job_kind(name: str, params: type[BaseModel] | None = None):
+    """Register a job handler under `name`; it receives the context and its parsed params."""
+
+    def register(run):
+        KINDS[name] = JobKind(run, params)
+        return run
+
+    return register
+
+
+# ------------------ Job kinds ------------------
+@job_kind("check-payments", CheckPaymentsParams)
+def _check_payments(ctx: JobContext, params: CheckPaymentsParams) -> dict:
+    db = SessionLocal()
+    try:
+        ctx.progress(0, None, "finding drift")
+        ids = [d.application_id for d in payment_cache.find_drift(db)]
+        repaired = 0
+        if params.repair:
+            for start in range(0, len(ids), REPAIR_BATCH):
+                ctx.progress(start, len(ids), "repairing")
+                repaired += payment_cache.repair(db, ids[start:start + REPAIR_BATCH])
+        return {"drifted": len(ids), "repaired": repaired, "application_ids": ids}
+    finally:
+        db.close()
+
+
+def _rebuild(rebuild: Callable[[Session], None]) -> Callable[[JobContext, None], None]:
+    def run(ctx: JobContext, params: None) -> None:
+        ctx.progress(0, 1)
+        db = SessionLocal()
+        try:
+            rebuild(db)
+        finally:
+            db.close()
+
+    return run
+
+
+job_kind("rebuild-earnings")(_rebuild(earnings_rollup.rebuild))
+job_kind("rebuild-stats")(_rebuild(pipeline_stats.rebuild))
+job_kind("rebuild-read-model")(_rebuild(read_model.rebuild))
+
+
+@job_kind("rebuild-search")
+def _rebuild_search(ctx: JobContext, params: None) -> dict:
+    ctx.progress(0, 1)
+    if not search_index.install(engine):
+        return {"enabled": False}
+    search_index.rebuild(engine)
+    return {"enabled": True}
+
+
+@job_kind("earnings-year", EarningsYearParams)
+def _earnings_year(ctx: JobContext, params: EarningsYearParams) -> dict:
+    """Itemized earnings of every month of a year, read from the payments table."""
+    months = []
+    db = SessionLocal()
+    try:
+        for month in range(1, 13):
+            ctx.progress(month - 1, 12, f"{params.year}-{month:02d}")
+            start = date(params.year, month, 1)
+            end = date(params.year + month // 12, month % 12 + 1, 1)
+            stmt = (
+                earnings_items_query()
+                .where(Payment.paid_date >= start, Payment.paid_date < end)
+                .order_by(Payment.paid_date, Payment.id)
+            )
+            if params.client_id is not None:
+                stmt = stmt.where(Vacancy.client_id == params.client_id)
+            if params.recruiter_id is not None:
+                stmt = stmt.where(Application.recruiter_id == params.recruiter_id)
+            items = row_dicts(db.execute(stmt))
+            months.append(
+                {
+                    "month": month,
+                    "total": round(sum(float(item["amount"] or 0.0) for item in items), 2),
+                    "payment_count": len(items),
+                    "items": items,
+                }
+            )
+    finally:
+        db.close()
+    return {
+        "year": params.year,
+        "total": round(sum(m["total"] for m in months), 2),
+        "payment_count": sum(m["payment_count"] for m in months),
+        "months": months,
+    }
+
+
+# ------------------ Queue ------------------
+def submit(db: Session, kind: str, params: dict) -> Job:
+    """Validate and queue a job."""
+    spec = KINDS.get(kind)
+    if spec is None:
+        raise HTTPException(400, f"Unknown job kind: {kind}. Known: {', '.join(sorted(KINDS))}")
+    if spec.params is not None:
+        try:
+            params = spec.params.model_validate(params).model_dump()
+        except ValidationError as exc:
+            errors = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors()
+            )
+            raise HTTPException(400, f"Invalid params: {errors}")
+    elif params:
+        raise HTTPException(400, f"{kind} takes no params")
+    job = Job(kind=kind, params=to_json(params).decode(), status=Job.QUEUED)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    runner.wake()
+    return job
+
+
+def cancel(db: Session, job_id: int) -> None:
+    """Cancel a queued job now, or ask a running one to stop."""
+    now = datetime.utcnow()
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_((Job.QUEUED, Job.RUNNING)))
+        .values(
+            cancel_requested=True,
+            status=case((Job.status == Job.QUEUED, Job.CANCELLED), else_=Job.status),
+            finished_at=case((Job.status == Job.QUEUED, now), else_=Job.finished_at),
+        )
+    )
+    db.commit()
+
+
+def claim(worker: str) -> int | None:
+    """Switch the oldest queued job to running for `worker`; None if there is none."""
+    db = SessionLocal()
+    try:
+        while True:
+            job_id = db.scalar(
+                select(Job.id).where(Job.status == Job.QUEUED).order_by(Job.id).limit(1)
+            )
+            if job_id is None:
+                return None
+            now = datetime.utcnow()
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == Job.QUEUED)
+                .values(status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now)
+            ).rowcount
+            db.commit()
+            # Another worker may have claimed it in between
+            if claimed:
+                return job_id
+    finally:
+        db.close()
+
+
+def execute(job_id: int, worker: str, stop: threading.Event | None = None) -> None:
+    """Run a claimed job and store its outcome."""
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        spec = KINDS.get(job.kind)
+        values: dict[str, Any] = {
+            "status": Job.SUCCEEDED,
+            "done": func.coalesce(Job.total, Job.done),
+        }
+        try:
+            if spec is None:
+                raise ValueError(f"Unknown job kind: {job.kind}")
+            params = spec.params.model_validate_json(job.params) if spec.params else None
+            result = spec.run(JobContext(job_id, stop), params)
+            if result is not None:
+                values["result"] = to_json(result).decode()
+        except JobCancelled:
+            # Unless a user cancelled it, the worker is shutting down: run it again later
+            values = {
+                "status": case((Job.cancel_requested, Job.CANCELLED), else_=Job.QUEUED),
+                "finished_at": case((Job.cancel_requested, datetime.utcnow()), else_=None),
+                "worker": None,
+            }
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", job_id, job.kind)
+            values = {"status": Job.FAILED, "error": f"{type(exc).__name__}: {exc}"}
+        values.setdefault("finished_at", datetime.utcnow())
+        # Only if the job was not handed to another worker as stale meanwhile
+        db.execute(
+            update(Job).where(Job.id == job_id, Job.worker == worker).values(**values)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def recover() -> int:
+    """Queue running jobs whose worker stopped sending heartbeats again."""
+    cutoff = datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+    db = SessionLocal()
+    try:
+        requeued = db.execute(
+            update(Job)
+            .where(Job.status == Job.RUNNING, Job.heartbeat_at < cutoff)
+            .values(status=Job.QUEUED, worker=None)
+        ).rowcount
+        db.commit()
+        if requeued:
+            logger.warning("Requeued %d job(s) of workers that stopped", requeued)
+        return requeued
+    finally:
+        db.close()
+
+
+def prune() -> int:
+    """Delete finished jobs older than the retention period."""
+    cutoff = datetime.utcnow() - RETENTION
+    db = SessionLocal()
+    try:
+        deleted = db.execute(
+            delete(Job).where(Job.status.in_(Job.FINISHED), Job.finished_at < cutoff)
+        ).rowcount
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+def run_pending(worker: str | None = None) -> int:
+    """Run queued jobs one by one in this thread until none is left. Returns their number."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    count = 0
+    while (job_id := claim(worker)) is not None:
+        execute(job_id, worker)
+        count += 1
+    return count
+
+
+# ------------------ Runner ------------------
+class Runner:
+    """
+    Dispatcher thread that claims queued jobs while fewer than `workers` of
+    its jobs run, and executes them on a thread pool of that size.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._active: set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; running ones stop at their next progress report and are requeued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def wake(self) -> None:
+        """Look for queued jobs now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        maintained_at = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - maintained_at >= HEARTBEAT_SECONDS:
+                    maintained_at = time.monotonic()
+                    self._heartbeat()
+                    recover()
+                    prune()
+                while len(self._active) < self.workers and not self._stop.is_set():
+                    job_id = claim(self.worker_id)
+                    if job_id is None:
+                        break
+                    with self._lock:
+                        self._active.add(job_id)
+                    self._executor.submit(self._execute, job_id)
+            except Exception:
+                logger.exception("Job dispatch failed")
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+
+    def _execute(self, job_id: int) -> None:
+        try:
+            execute(job_id, self.worker_id, self._stop)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            self._wake.set()
+
+    def _heartbeat(self) -> None:
+        with self._lock:
+            active = list(self._active)
+        if not active:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id.in_(active), Job.worker == self.worker_id)
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+runner = Runner(WORKERS)
@@ -1,34 +1,73 @@
 
 
+# Imported first so the cold start profile can time the imports below
+import startup_profile
+
+startup_profile.mark("interpreter")
+
+import io
+from dataclasses import asdict
 from datetime import date
 from pathlib import Path
-from fastapi import FastAPI, Depends, HTTPException, Query
+from typing import Literal
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func, or_, tuple_
 
-from database import SessionLocal, engine
-from database import Base
-from models import Client, Recruiter, Vacancy, Candidate, Application, Payment
+from database import SessionLocal, engine, ASYNC_MODE, IS_SQLITE, pool_status
+from models import (
+    Client, Recruiter, Vacancy, Candidate, Application, Payment, EarningsRollup, ChangeLog,
+    Job,
+)
+from pagination import encode_cursor, decode_cursor
+import search_index
+import payment_cache
+import earnings_rollup
+import pipeline_stats
+import read_model
+import bootstrap
+import bulk_import
+import change_feed
+import idempotency
+import jobs
+import compression
+import exports
+import async_endpoints
+import sqlite_tuning
+import metrics
+import static_assets
+import status_batch
+from reference_cache import cache as reference_cache
+from serialization import json_response, row_dicts
+import data_versions
+from queries import earnings_items_query
+from validation import enforce_dates_for_status
 from schemas import (
     ClientCreate, ClientOut,
     RecruiterCreate, RecruiterOut,
     VacancyCreate, VacancyOut,
     CandidateCreate, CandidateOut,
-    ApplicationCreate, ApplicationUpdate, ApplicationOut, ApplicationRow,
+    ApplicationCreate, ApplicationUpdate, ApplicationOut, ApplicationRow, PipelinePage,
+    PipelineChanges,
+    StatusBatch, StatusBatchReport,
     PaymentCreate, PaymentOut,
-    EarningsReport, EarningsItem
+    EarningsReport, EarningsItemsPage,
+    EarningsSummary, EarningsBreakdown, EarningsMonth, EarningsTrend,
+    FunnelStats,
+    ImportReport,
+    JobCreate, JobOut,
 )
 
+startup_profile.mark("imports")
 
 
-# Create database tables on startup
-Base.metadata.create_all(bind=engine)
-
-
-app = FastAPI(title="Recruiting CRM", version="1.1")
+app = FastAPI(
+    title="Recruiting CRM",
+    version="1.1",
+    default_response_class=metrics.TimedJSONResponse,
+)
 
 # Configure CORS so that the React frontend can communicate with this API
 import os
@@ -59,10 +98,32 @@ else:
         allow_headers=["*"],
     )
 
-# Mount static files from frontend/dist
+# gzip for large JSON responses; inside the metrics middleware so response
+# sizes are measured as sent
+app.add_middleware(compression.GZipJSONMiddleware)
+
+# Latency, SQL and response size per route for /metrics; outermost so it
+# sees the final status and body
+app.add_middleware(metrics.MetricsMiddleware)
+
+if startup_profile.ENABLED:
+    app.add_middleware(startup_profile.FirstRequestMiddleware)
+
+# Mount static files from frontend/dist; hashed asset names never change, so
+# they are cached as immutable, while index.html is always revalidated
 FRONTEND_DIST = Path(__file__).parent.parent / "frontend" / "dist"
+frontend_index = None
 if FRONTEND_DIST.exists():
-    app.mount("/assets", StaticFiles(directory=str(FRONTEND_DIST / "assets")), name="assets")
+    app.mount(
+        "/assets",
+        static_assets.FrontendFiles(
+            directory=str(FRONTEND_DIST / "assets"), cache_control=static_assets.IMMUTABLE
+        ),
+        name="assets",
+    )
+    frontend_index = static_assets.FrontendFiles(
+        directory=str(FRONTEND_DIST), cache_control=static_assets.REVALIDATE
+    )
 
 
 # Dependency that provides a database session per request
@@ -74,19 +135,73 @@ def get_db():
         db.close()
 
 
-# Seed initial clients on startup if none exist
+# ------------------ Conditional GET ------------------
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+@app.exception_handler(NotModified)
+def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers={"ETag": exc.etag})
+
+
+def conditional(*tables: str):
+    """
+    Dependency for GET endpoints built from `tables`. Computes the ETag from
+    the tables' data versions, answers 304 when it matches If-None-Match
+    (before the endpoint runs its query) and otherwise sets the ETag header.
+    Endpoints returning a Response directly add the returned ETag themselves.
+    """
+
+    def dependency(request: Request, response: Response, db: Session = Depends(get_db)) -> str:
+        url = request.url.path + "?" + request.url.query
+        etag = data_versions.etag(url, db, tables)
+        if data_versions.matches(request.headers.get("if-none-match"), etag):
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        return etag
+
+    return dependency
+
+
+PIPELINE_TABLES = ("applications", "candidates", "vacancies", "clients", "recruiters")
+EARNINGS_TABLES = (*PIPELINE_TABLES, "payments", "earnings_rollup")
+
+
+# Check the schema version; a new or outdated database is bootstrapped
+# (migrations, search index, seed data) unless DB_AUTO_BOOTSTRAP=0
 @app.on_event("startup")
-def seed_initial_clients():
-    db = SessionLocal()
-    try:
-        count = db.scalar(select(func.count()).select_from(Client))
-        if count == 0:
-            db.add_all(
-                [Client(name="Client A"), Client(name="Client B"), Client(name="Client C")]
-            )
-            db.commit()
-    finally:
-        db.close()
+def prepare_database():
+    bootstrap.prepare(engine)
+    startup_profile.mark("database")
+
+
+# Periodic WAL checkpoints and PRAGMA optimize for SQLite deployments
+sqlite_maintenance = sqlite_tuning.Maintenance.from_env(engine) if IS_SQLITE else None
+
+
+@app.on_event("startup")
+def start_sqlite_maintenance():
+    if sqlite_maintenance is not None:
+        sqlite_maintenance.start()
+
+
+@app.on_event("shutdown")
+def stop_sqlite_maintenance():
+    if sqlite_maintenance is not None:
+        sqlite_maintenance.stop()
+
+
+# Background job workers of this process (JOB_WORKERS, 0 = none)
+@app.on_event("startup")
+def start_job_runner():
+    jobs.runner.start()
+
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    jobs.runner.stop()
 
 
 @app.get("/health")
@@ -95,51 +210,43 @@ def health_check():
     return {"ok": True}
 
 
-# ------------------ Helpers ------------------
-VALID_STATUSES = {"new", "in_process", "rejected", "hired"}
+@app.get("/health/pool")
+def pool_health():
+    """Connection pool statistics: checked-out connections and checkout wait times."""
+    return pool_status()
 
 
-def enforce_dates_for_status(status: str, rejection_date: date | None, start_date: date | None):
-    """
-    Validate that the appropriate dates are supplied for the given status.
-    If the status is 'rejected', a rejection_date is required.
-    If the status is 'hired', a start_date is required.
-    """
-    if status not in VALID_STATUSES:
-        raise HTTPException(400, f"Invalid status: {status}")
-    if status == "rejected" and rejection_date is None:
-        raise HTTPException(400, "For status 'rejected' rejection_date is required")
-    if status == "hired" and start_date is None:
-        raise HTTPException(400, "For status 'hired' start_date is required")
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
-def recompute_payment_cache(db: Session, app_id: int):
-    """
-    Recalculate the cached payment fields for an application.
-    Total payment amount and last payment date are derived from the associated
-    Payment records. The Application.paid flag is set to True if the sum > 0.
-    """
-    total = db.scalar(
-        select(func.coalesce(func.sum(Payment.amount), 0.0)).where(
-            Payment.application_id == app_id
-        )
-    )
-    last_date = db.scalar(
-        select(func.max(Payment.paid_date)).where(Payment.application_id == app_id)
+@app.get("/health/cache")
+def cache_health():
+    """Hit/miss counters and versions of the reference data cache."""
+    return reference_cache.stats()
+
+
+# ------------------ Idempotent Writes ------------------
+@app.exception_handler(idempotency.Replay)
+def idempotent_replay_handler(request: Request, exc: idempotency.Replay):
+    return Response(
+        exc.body,
+        status_code=exc.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
     )
-    app = db.get(Application, app_id)
-    if app is None:
-        return
-    app.payment_amount = float(total or 0.0)
-    app.paid_date = last_date
-    app.paid = app.payment_amount > 0
-    db.commit()
 
 
 # ------------------ Client Endpoints ------------------
 @app.get("/clients", response_model=list[ClientOut])
-def list_clients(db: Session = Depends(get_db)):
-    return db.scalars(select(Client).order_by(Client.name)).all()
+def list_clients(
+    db: Session = Depends(get_db), etag: str = Depends(conditional("clients"))
+):
+    body = reference_cache.get(db, "clients").body()
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 
 @app.post("/clients", response_model=ClientOut)
@@ -149,6 +256,7 @@ def create_client(payload: ClientCreate, db: Session = Depends(get_db)):
     client = Client(name=payload.name)
     db.add(client)
     db.commit()
+    reference_cache.invalidate("clients")
     db.refresh(client)
     return client
 
@@ -158,15 +266,24 @@ def delete_client(client_id: int, db: Session = Depends(get_db)):
     client = db.get(Client, client_id)
     if not client:
         raise HTTPException(404, "Client not found")
+    earnings_rollup.apply(db, Vacancy.client_id == client_id, sign=-1)
+    pipeline_stats.apply(db, Vacancy.client_id == client_id, sign=-1)
+    read_model.remove(db, Vacancy.client_id == client_id)
+    change_feed.record(db, Vacancy.client_id == client_id, op=ChangeLog.DELETE)
     db.delete(client)
     db.commit()
+    # Deleting a client cascades to its vacancies
+    reference_cache.invalidate("clients", "vacancies")
     return {"deleted": True}
 
 
 # ------------------ Recruiter Endpoints ------------------
 @app.get("/recruiters", response_model=list[RecruiterOut])
-def list_recruiters(db: Session = Depends(get_db)):
-    return db.scalars(select(Recruiter).order_by(Recruiter.name)).all()
+def list_recruiters(
+    db: Session = Depends(get_db), etag: str = Depends(conditional("recruiters"))
+):
+    body = reference_cache.get(db, "recruiters").body()
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 
 @app.post("/recruiters", response_model=RecruiterOut)
@@ -176,6 +293,7 @@ def create_recruiter(payload: RecruiterCreate, db: Session = Depends(get_db)):
     recruiter = Recruiter(name=payload.name)
     db.add(recruiter)
     db.commit()
+    reference_cache.invalidate("recruiters")
     db.refresh(recruiter)
     return recruiter
 
@@ -185,20 +303,28 @@ def delete_recruiter(recruiter_id: int, db: Session = Depends(get_db)):
     recruiter = db.get(Recruiter, recruiter_id)
     if not recruiter:
         raise HTTPException(404, "Recruiter not found")
+    # Applications do not cascade with their recruiter
+    if db.scalar(select(Application.id).where(Application.recruiter_id == recruiter_id).limit(1)):
+        raise HTTPException(400, "Recruiter still has applications")
     db.delete(recruiter)
     db.commit()
+    reference_cache.invalidate("recruiters")
     return {"deleted": True}
 
 
 # ------------------ Vacancy Endpoints ------------------
 @app.get("/vacancies", response_model=list[VacancyOut])
 def list_vacancies(
-    client_id: int | None = None, db: Session = Depends(get_db)
-) -> list[VacancyOut]:
-    stmt = select(Vacancy).order_by(Vacancy.title)
-    if client_id is not None:
-        stmt = stmt.where(Vacancy.client_id == client_id)
-    return db.scalars(stmt).all()
+    client_id: int | None = None,
+    db: Session = Depends(get_db),
+    etag: str = Depends(conditional("vacancies")),
+):
+    snapshot = reference_cache.get(db, "vacancies")
+    if client_id is None:
+        body = snapshot.body()
+    else:
+        body = snapshot.body(client_id, lambda v: v.client_id == client_id)
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 
 @app.post("/vacancies", response_model=VacancyOut)
@@ -212,6 +338,7 @@ def create_vacancy(payload: VacancyCreate, db: Session = Depends(get_db)):
     )
     db.add(vacancy)
     db.commit()
+    reference_cache.invalidate("vacancies")
     db.refresh(vacancy)
     return vacancy
 
@@ -221,8 +348,13 @@ def delete_vacancy(vacancy_id: int, db: Session = Depends(get_db)):
     vacancy = db.get(Vacancy, vacancy_id)
     if not vacancy:
         raise HTTPException(404, "Vacancy not found")
+    earnings_rollup.apply(db, Application.vacancy_id == vacancy_id, sign=-1)
+    pipeline_stats.apply(db, Application.vacancy_id == vacancy_id, sign=-1)
+    read_model.remove(db, Application.vacancy_id == vacancy_id)
+    change_feed.record(db, Application.vacancy_id == vacancy_id, op=ChangeLog.DELETE)
     db.delete(vacancy)
     db.commit()
+    reference_cache.invalidate("vacancies")
     return {"deleted": True}
 
 
@@ -230,7 +362,16 @@ def delete_vacancy(vacancy_id: int, db: Session = Depends(get_db)):
 @app.get("/candidates", response_model=list[CandidateOut])
 def list_candidates(q: str | None = None, db: Session = Depends(get_db)):
     stmt = select(Candidate).order_by(Candidate.full_name)
-    if q:
+    expr = search_index.match_expression(q) if q and search_index.enabled else None
+    if expr:
+        # Best matches first, then alphabetically
+        hits = search_index.matches(search_index.CANDIDATE, expr).subquery()
+        stmt = (
+            select(Candidate)
+            .join(hits, hits.c.ref_id == Candidate.id)
+            .order_by(hits.c.rank, Candidate.full_name)
+        )
+    elif q:
         like = f"%{q.strip()}%"
         stmt = stmt.where(
             or_(
@@ -253,7 +394,13 @@ def create_candidate(payload: CandidateCreate, db: Session = Depends(get_db)):
 
 # ------------------ Application Endpoints ------------------
 @app.post("/applications", response_model=ApplicationOut)
-def create_application(payload: ApplicationCreate, db: Session = Depends(get_db)):
+def create_application(
+    payload: ApplicationCreate,
+    # Before db, so a failed request's claim is released after its rollback
+    claim: idempotency.Claim | None = Depends(idempotency.idempotency_key),
+    db: Session = Depends(get_db),
+):
+    """Retries sending the same Idempotency-Key get the first response back."""
     # Validate foreign keys
     if not db.get(Candidate, payload.candidate_id):
         raise HTTPException(400, "Candidate not found")
@@ -279,31 +426,48 @@ def create_application(payload: ApplicationCreate, db: Session = Depends(get_db)
         replacement_of_id=payload.replacement_of_id,
         replacement_note=payload.replacement_note,
     )
-    db.add(application)
-    db.commit()
-    db.refresh(application)
 
-    # Optionally create an initial payment when the application is created
+    # Optionally create an initial payment when the application is created.
+    # The payment and the cached totals are written in the same transaction.
     if payload.paid and payload.paid_date:
         amount = (
             payload.payment_amount
             if payload.payment_amount and payload.payment_amount > 0
             else float(vacancy.fee_amount or 0.0)
         )
-        payment = Payment(
-            application_id=application.id,
-            paid_date=payload.paid_date,
-            amount=float(amount),
-            note="initial payment",
+        application.payments.append(
+            Payment(
+                paid_date=payload.paid_date,
+                amount=float(amount),
+                note="initial payment",
+            )
         )
-        db.add(payment)
-        db.commit()
-        recompute_payment_cache(db, application.id)
-        db.refresh(application)
+        application.payment_amount = round(float(amount), 2)
+        application.paid_date = payload.paid_date
+        application.paid = application.payment_amount > 0
 
+    db.add(application)
+    db.flush()
+    pipeline_stats.apply(db, Application.id == application.id)
+    if application.payments:
+        earnings_rollup.apply(db, Payment.application_id == application.id)
+    read_model.refresh(db, Application.id == application.id)
+    change_feed.record(db, Application.id == application.id)
+    idempotency.complete(db, claim, ApplicationOut.model_validate(application))
+    db.commit()
+    db.refresh(application)
     return application
 
 
+@app.post("/applications/status", response_model=StatusBatchReport)
+def update_application_statuses(payload: StatusBatch, db: Session = Depends(get_db)):
+    """
+    Move many applications to one status in a single UPDATE. Returns a result
+    per id; with `atomic` any failure rejects the batch with 400.
+    """
+    return status_batch.apply(db, payload)
+
+
 @app.patch("/applications/{app_id}", response_model=ApplicationOut)
 def update_application(
     app_id: int, payload: ApplicationUpdate, db: Session = Depends(get_db)
@@ -311,12 +475,17 @@ def update_application(
     application = db.get(Application, app_id)
     if not application:
         raise HTTPException(404, "Application not found")
+    pipeline_stats.apply(db, Application.id == app_id, sign=-1)
     data = payload.model_dump(exclude_unset=True)
     for key, value in data.items():
         setattr(application, key, value)
 
     enforce_dates_for_status(application.status, application.rejection_date, application.start_date)
 
+    db.flush()
+    pipeline_stats.apply(db, Application.id == app_id)
+    read_model.refresh(db, Application.id == app_id)
+    change_feed.record(db, Application.id == app_id)
     db.commit()
     db.refresh(application)
     return application
@@ -327,6 +496,10 @@ def delete_application(app_id: int, db: Session = Depends(get_db)):
     application = db.get(Application, app_id)
     if not application:
         raise HTTPException(404, "Application not found")
+    earnings_rollup.apply(db, Payment.application_id == app_id, sign=-1)
+    pipeline_stats.apply(db, Application.id == app_id, sign=-1)
+    read_model.remove(db, Application.id == app_id)
+    change_feed.record(db, Application.id == app_id, op=ChangeLog.DELETE)
     db.delete(application)
     db.commit()
     return {"deleted": True}
@@ -345,8 +518,16 @@ def list_payments(app_id: int, db: Session = Depends(get_db)):
 
 
 @app.post("/applications/{app_id}/payments", response_model=PaymentOut)
-def add_payment(app_id: int, payload: PaymentCreate, db: Session = Depends(get_db)):
-    if not db.get(Application, app_id):
+def add_payment(
+    app_id: int,
+    payload: PaymentCreate,
+    # Before db, so a failed request's claim is released after its rollback
+    claim: idempotency.Claim | None = Depends(idempotency.idempotency_key),
+    db: Session = Depends(get_db),
+):
+    """Retries sending the same Idempotency-Key get the first response back."""
+    # Updating the cached totals doubles as the existence check
+    if not payment_cache.apply_payment(db, app_id, float(payload.amount), payload.paid_date):
         raise HTTPException(404, "Application not found")
     payment = Payment(
         application_id=app_id,
@@ -355,9 +536,13 @@ def add_payment(app_id: int, payload: PaymentCreate, db: Session = Depends(get_d
         note=payload.note,
     )
     db.add(payment)
+    db.flush()
+    earnings_rollup.apply(db, Payment.id == payment.id)
+    read_model.refresh(db, Application.id == app_id)
+    change_feed.record(db, Application.id == app_id)
+    idempotency.complete(db, claim, PaymentOut.model_validate(payment))
     db.commit()
     db.refresh(payment)
-    recompute_payment_cache(db, app_id)
     return payment
 
 
@@ -366,17 +551,40 @@ def delete_payment(payment_id: int, db: Session = Depends(get_db)):
     payment = db.get(Payment, payment_id)
     if not payment:
         raise HTTPException(404, "Payment not found")
-    app_id = payment.application_id
+    earnings_rollup.apply(db, Payment.id == payment_id, sign=-1)
     db.delete(payment)
+    db.flush()
+    payment_cache.revert_payment(db, payment)
+    read_model.refresh(db, Application.id == payment.application_id)
+    change_feed.record(db, Application.id == payment.application_id)
     db.commit()
-    recompute_payment_cache(db, app_id)
     return {"deleted": True}
 
 
+# ------------------ Bulk Import Endpoint ------------------
+@app.post("/import/{kind}", response_model=ImportReport)
+def import_records(
+    kind: Literal["candidates", "applications"],
+    file: UploadFile,
+    format: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Bulk-import candidates or applications from an uploaded CSV or JSONL file.
+    The file is streamed and inserted in batches; rows that fail validation
+    are skipped and listed in the report.
+    """
+    fmt = bulk_import.detect_format(file.filename, format)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    result = bulk_import.IMPORTERS[kind](db, bulk_import.iter_records(stream, fmt))
+    return ImportReport(**asdict(result))
+
+
 # ------------------ Pipeline Endpoint ------------------
 @app.get("/pipeline", response_model=list[ApplicationRow])
 def get_pipeline(
     db: Session = Depends(get_db),
+    etag: str = Depends(conditional(*PIPELINE_TABLES)),
     client_id: int | None = None,
     recruiter_id: int | None = None,
     status: str | None = None,
@@ -388,111 +596,419 @@ def get_pipeline(
     This endpoint joins the application with candidate, recruiter, vacancy and client
     to return a single row with all necessary information for the UI.
     """
-    stmt = (
-        select(
-            Application.id,
-            Application.date_contacted,
-            Application.status,
-            Application.rejection_date,
-            Application.start_date,
-            Application.paid,
-            Application.paid_date,
-            Application.payment_amount,
-            Application.is_replacement,
-            Application.replacement_of_id,
-            Application.replacement_note,
-
-            Candidate.id.label("candidate_id"),
-            Candidate.full_name.label("candidate_name"),
-
-            Recruiter.id.label("recruiter_id"),
-            Recruiter.name.label("recruiter_name"),
-
-            Vacancy.id.label("vacancy_id"),
-            Vacancy.title.label("vacancy_title"),
-            Vacancy.fee_amount.label("vacancy_fee"),
-
-            Client.id.label("client_id"),
-            Client.name.label("client_name"),
-        )
-        .join(Candidate, Candidate.id == Application.candidate_id)
-        .join(Recruiter, Recruiter.id == Application.recruiter_id)
-        .join(Vacancy, Vacancy.id == Application.vacancy_id)
-        .join(Client, Client.id == Vacancy.client_id)
-        .order_by(Application.created_at.desc())
-        .limit(limit)
+    stmt = read_model.pipeline_query(client_id, recruiter_id, status, search).limit(limit)
+    rows = db.execute(stmt).all()
+    return json_response(row_dicts(rows), headers={"ETag": etag})
+
+
+@app.get("/pipeline/page", response_model=PipelinePage)
+def get_pipeline_page(
+    db: Session = Depends(get_db),
+    etag: str = Depends(conditional(*PIPELINE_TABLES)),
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    status: str | None = None,
+    search: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=500),
+):
+    """
+    Cursor-paginated variant of the pipeline endpoint.
+    Pass `next_cursor` from the previous page to continue where it ended; each
+    page is a range scan on (created_at, id) so its cost depends only on `limit`.
+    """
+    sort_created_at, sort_id = read_model.sort_key()
+    stmt = read_model.pipeline_query(client_id, recruiter_id, status, search).add_columns(
+        sort_created_at
+    )
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(sort_created_at, sort_id) < (created_at, last_id))
+
+    # Fetch one extra row to find out whether another page exists
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (
+        encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    )
+    return json_response(
+        {
+            "items": row_dicts(rows, exclude=("created_at",)),
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        },
+        headers={"ETag": etag},
     )
 
-    if client_id is not None:
-        stmt = stmt.where(Client.id == client_id)
-    if recruiter_id is not None:
-        stmt = stmt.where(Recruiter.id == recruiter_id)
-    if status is not None:
-        stmt = stmt.where(Application.status == status)
-    if search:
-        like = f"%{search.strip()}%"
-        stmt = stmt.where(
-            or_(
-                Candidate.full_name.ilike(like),
-                Vacancy.title.ilike(like),
-                Client.name.ilike(like),
-                Recruiter.name.ilike(like),
-            )
-        )
 
-    rows = db.execute(stmt).all()
-    return [ApplicationRow(**row._asdict()) for row in rows]
+# ------------------ Pipeline Change Feed ------------------
+@app.get("/pipeline/stream")
+async def pipeline_stream(
+    request: Request,
+    since: int | None = Query(default=None, ge=0),
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    follow: bool = True,
+):
+    """
+    Server-Sent Events with pipeline row changes: `upsert` (an ApplicationRow),
+    `delete` ({"id": ...}), `ready` once caught up and `reset` when the client
+    must reload /pipeline. Each event id is a sequence number; `since` (or the
+    Last-Event-ID header an EventSource sends on reconnect) resumes after it.
+    With `follow=false` the stream ends once caught up.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        change_feed.feed.stream(since, client_id, recruiter_id, follow),
+        media_type="text/event-stream",
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-# ------------------ Earnings Report Endpoint ------------------
-@app.get("/reports/earnings", response_model=EarningsReport)
-def earnings_report(year: int, month: int, db: Session = Depends(get_db)):
+@app.get("/pipeline/changes", response_model=PipelineChanges)
+def get_pipeline_changes(
+    db: Session = Depends(get_db),
+    since: int | None = Query(default=None, ge=0),
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    limit: int = Query(default=500, ge=1, le=change_feed.BATCH_SIZE),
+):
     """
-    Returns a monthly earnings report, summing payments by paid_date.
-    The start and end boundaries are inclusive/exclusive on month boundaries.
+    Delta sync for clients that poll: ApplicationRows inserted or changed
+    since the `since` token, ids deleted since, and the `token` to pass next
+    time. Continue right away while `has_more`. `reset` (also returned
+    without `since`) means the token is too old: reload /pipeline, then
+    continue from the returned token.
     """
+    return json_response(change_feed.changes_since(db, since, client_id, recruiter_id, limit))
+
+
+# ------------------ Earnings Report Endpoints ------------------
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    """Return the [start, end) date range of a calendar month."""
     if month < 1 or month > 12:
         raise HTTPException(400, "month must be 1..12")
     start = date(year, month, 1)
     end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+@app.get("/reports/earnings", response_model=EarningsReport)
+def earnings_report(
+    year: int,
+    month: int,
+    db: Session = Depends(get_db),
+    etag: str = Depends(conditional(*EARNINGS_TABLES)),
+):
+    """
+    Returns a monthly earnings report, summing payments by paid_date.
+    The start and end boundaries are inclusive/exclusive on month boundaries.
+    """
+    start, end = month_bounds(year, month)
 
+    stmt = (
+        earnings_items_query()
+        .where(Payment.paid_date >= start)
+        .where(Payment.paid_date < end)
+        .order_by(Payment.paid_date.desc(), Payment.created_at.desc())
+    )
+
+    items = row_dicts(db.execute(stmt))
+    total = sum(float(item["amount"] or 0.0) for item in items)
+    return json_response(
+        {"year": year, "month": month, "total": round(total, 2), "items": items},
+        headers={"ETag": etag},
+    )
+
+
+@app.get(
+    "/reports/earnings/summary",
+    response_model=EarningsSummary,
+    dependencies=[Depends(conditional("earnings_rollup", "clients", "recruiters"))],
+)
+def earnings_summary(year: int, month: int, db: Session = Depends(get_db)):
+    """
+    Month total with per-client and per-recruiter breakdowns, read from the
+    earnings rollup rather than the payments table.
+    """
+    month_bounds(year, month)
+    in_month = (EarningsRollup.year == year, EarningsRollup.month == month)
+
+    def breakdown(entity) -> list[EarningsBreakdown]:
+        key = EarningsRollup.client_id if entity is Client else EarningsRollup.recruiter_id
+        stmt = (
+            select(
+                entity.id,
+                entity.name,
+                func.sum(EarningsRollup.total).label("total"),
+                func.sum(EarningsRollup.payment_count).label("payment_count"),
+            )
+            .join(entity, entity.id == key)
+            .where(*in_month)
+            .group_by(entity.id, entity.name)
+            .order_by(func.sum(EarningsRollup.total).desc())
+        )
+        return [
+            EarningsBreakdown(
+                id=row.id,
+                name=row.name,
+                total=round(row.total, 2),
+                payment_count=row.payment_count,
+            )
+            for row in db.execute(stmt)
+        ]
+
+    by_client = breakdown(Client)
+    return EarningsSummary(
+        year=year,
+        month=month,
+        total=round(sum(b.total for b in by_client), 2),
+        payment_count=sum(b.payment_count for b in by_client),
+        by_client=by_client,
+        by_recruiter=breakdown(Recruiter),
+    )
+
+
+@app.get("/reports/earnings/trend", response_model=EarningsTrend)
+def earnings_trend(
+    start_year: int,
+    start_month: int = 1,
+    end_year: int | None = None,
+    end_month: int | None = None,
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Month-by-month totals over an inclusive range, optionally limited to one
+    client or recruiter. Without an end the range runs to the current month,
+    e.g. `start_year=2024` gives a year-to-date trend.
+    """
+    today = date.today()
+    end_year = end_year if end_year is not None else today.year
+    end_month = end_month if end_month is not None else today.month
+    month_bounds(start_year, start_month)
+    month_bounds(end_year, end_month)
+    first = start_year * 12 + start_month - 1
+    last = end_year * 12 + end_month - 1
+    if last < first:
+        raise HTTPException(400, "end must not be before start")
+    if last - first >= 120:
+        raise HTTPException(400, "range is limited to 120 months")
+
+    key = EarningsRollup.year * 12 + EarningsRollup.month - 1
     stmt = (
         select(
-            Payment.id.label("payment_id"),
-            Payment.paid_date,
-            Payment.amount.label("amount"),
-            Candidate.full_name.label("candidate_name"),
-            Client.name.label("client_name"),
-            Vacancy.title.label("vacancy_title"),
-            Recruiter.name.label("recruiter_name"),
-            Application.id.label("application_id"),
+            EarningsRollup.year,
+            EarningsRollup.month,
+            func.sum(EarningsRollup.total).label("total"),
+            func.sum(EarningsRollup.payment_count).label("payment_count"),
+        )
+        .where(key >= first, key <= last)
+        .group_by(EarningsRollup.year, EarningsRollup.month)
+    )
+    if client_id is not None:
+        stmt = stmt.where(EarningsRollup.client_id == client_id)
+    if recruiter_id is not None:
+        stmt = stmt.where(EarningsRollup.recruiter_id == recruiter_id)
+    found = {(row.year, row.month): row for row in db.execute(stmt)}
+
+    # Months without payments are reported with zero totals
+    months: list[EarningsMonth] = []
+    for index in range(first, last + 1):
+        y, m = divmod(index, 12)
+        row = found.get((y, m + 1))
+        months.append(
+            EarningsMonth(
+                year=y,
+                month=m + 1,
+                total=round(row.total, 2) if row else 0.0,
+                payment_count=row.payment_count if row else 0,
+            )
         )
-        .join(Application, Application.id == Payment.application_id)
-        .join(Candidate, Candidate.id == Application.candidate_id)
-        .join(Recruiter, Recruiter.id == Application.recruiter_id)
-        .join(Vacancy, Vacancy.id == Application.vacancy_id)
-        .join(Client, Client.id == Vacancy.client_id)
+    return EarningsTrend(total=round(sum(m.total for m in months), 2), months=months)
+
+
+@app.get("/reports/earnings/items", response_model=EarningsItemsPage)
+def earnings_items(
+    year: int,
+    month: int,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    etag: str = Depends(conditional(*EARNINGS_TABLES)),
+):
+    """
+    Itemized payments of a month, newest first, paginated with a keyset
+    cursor on (paid_date, payment id).
+    """
+    start, end = month_bounds(year, month)
+    stmt = (
+        earnings_items_query()
         .where(Payment.paid_date >= start)
         .where(Payment.paid_date < end)
-        .order_by(Payment.paid_date.desc(), Payment.created_at.desc())
+        .order_by(Payment.paid_date.desc(), Payment.id.desc())
+    )
+    if cursor:
+        paid_date, last_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Payment.paid_date, Payment.id) < (paid_date.date(), last_id))
+
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (
+        encode_cursor(rows[-1].paid_date, rows[-1].payment_id) if has_more else None
+    )
+    return json_response(
+        {"items": row_dicts(rows), "next_cursor": next_cursor, "has_more": has_more},
+        headers={"ETag": etag},
     )
 
-    rows = db.execute(stmt).all()
-    items: list[EarningsItem] = []
-    total = 0.0
-    for row in rows:
-        data = row._asdict()
-        total += float(data["amount"] or 0.0)
-        items.append(EarningsItem(**data))
 
-    return EarningsReport(year=year, month=month, total=round(total, 2), items=items)
+# ------------------ Funnel Statistics Endpoint ------------------
+@app.get("/reports/funnel", response_model=FunnelStats)
+def funnel_stats(
+    group_by: Literal["client", "vacancy", "recruiter"] | None = None,
+    client_id: int | None = None,
+    vacancy_id: int | None = None,
+    recruiter_id: int | None = None,
+    db: Session = Depends(get_db),
+    etag: str = Depends(conditional("pipeline_stats", "clients", "vacancies", "recruiters")),
+):
+    """
+    Status counts, hire/rejection rates and time-to-hire/time-to-rejection
+    distributions, overall and optionally per client, vacancy or recruiter.
+    Read from the funnel counters, never from the applications table.
+    """
+    names = {}
+    if group_by == "client":
+        names = {c.id: c.name for c in reference_cache.get(db, "clients").items}
+    elif group_by == "vacancy":
+        names = {v.id: v.title for v in reference_cache.get(db, "vacancies").items}
+    elif group_by == "recruiter":
+        names = {r.id: r.name for r in reference_cache.get(db, "recruiters").items}
+    return pipeline_stats.funnel(db, names, group_by, client_id, vacancy_id, recruiter_id)
+
+
+# ------------------ Export Endpoints ------------------
+@app.get("/export/pipeline")
+def export_pipeline(
+    format: str = "csv",
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    status: str | None = None,
+    search: str | None = None,
+    contacted_from: date | None = None,
+    contacted_to: date | None = None,
+):
+    """
+    Stream all pipeline rows matching the filters as CSV or NDJSON.
+    `contacted_from`/`contacted_to` bound date_contacted (both inclusive).
+    """
+    stmt = read_model.pipeline_query(client_id, recruiter_id, status, search)
+    date_contacted = stmt.selected_columns.date_contacted
+    if contacted_from is not None:
+        stmt = stmt.where(date_contacted >= contacted_from)
+    if contacted_to is not None:
+        stmt = stmt.where(date_contacted <= contacted_to)
+    return exports.stream_export(stmt, format, "pipeline")
+
+
+@app.get("/export/earnings")
+def export_earnings(
+    format: str = "csv",
+    paid_from: date | None = None,
+    paid_to: date | None = None,
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+):
+    """
+    Stream itemized payments as CSV or NDJSON, oldest first.
+    `paid_from`/`paid_to` bound the payment date (both inclusive).
+    """
+    stmt = earnings_items_query().order_by(Payment.paid_date, Payment.id)
+    if paid_from is not None:
+        stmt = stmt.where(Payment.paid_date >= paid_from)
+    if paid_to is not None:
+        stmt = stmt.where(Payment.paid_date <= paid_to)
+    if client_id is not None:
+        stmt = stmt.where(Client.id == client_id)
+    if recruiter_id is not None:
+        stmt = stmt.where(Recruiter.id == recruiter_id)
+    return exports.stream_export(stmt, format, "earnings")
+
+
+# ------------------ Background Jobs ------------------
+@app.post("/jobs", response_model=JobOut, status_code=202)
+def submit_job(payload: JobCreate, db: Session = Depends(get_db)):
+    """
+    Queue a heavy operation and return at once; poll GET /jobs/{id} for
+    progress. Kinds: check-payments ({"repair": bool}), rebuild-earnings,
+    rebuild-stats, rebuild-read-model, rebuild-search and earnings-year
+    ({"year": int, "client_id"?, "recruiter_id"?}).
+    """
+    return jobs.submit(db, payload.kind, payload.params)
+
+
+@app.get("/jobs", response_model=list[JobOut])
+def list_jobs(
+    db: Session = Depends(get_db),
+    status: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """Most recent jobs first."""
+    stmt = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status is not None:
+        stmt = stmt.where(Job.status == status)
+    return db.scalars(stmt).all()
+
+
+@app.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: int, db: Session = Depends(get_db)):
+    """The JSON result of a succeeded job, as stored."""
+    row = db.execute(select(Job.status, Job.result).where(Job.id == job_id)).first()
+    if row is None:
+        raise HTTPException(404, "Job not found")
+    if row.status != Job.SUCCEEDED:
+        raise HTTPException(409, f"Job is {row.status}")
+    return Response(row.result or "null", media_type="application/json")
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobOut)
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """Cancel a queued job, or stop a running one at its next progress report."""
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    jobs.cancel(db, job_id)
+    db.refresh(job)
+    return job
 
 
 # ------------------ Frontend Routes ------------------
 @app.get("/")
-def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the main frontend application."""
-    index_file = FRONTEND_DIST / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
-    return {"error": "Frontend not built"}
\ No newline at end of file
+    if frontend_index is not None and (FRONTEND_DIST / "index.html").exists():
+        return await frontend_index.get_response("index.html", request.scope)
+    return {"error": "Frontend not built"}
+
+
+# ------------------ Async Mode ------------------
+# Registered last so every database-backed route above is converted
+if ASYNC_MODE:
+    async_endpoints.install(app, get_db)
+
+startup_profile.mark("routes")
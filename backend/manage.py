@@ -0,0 +1,267 @@
+"""
+Command line maintenance tasks for the recruiting CRM backend.
+
+Run from the backend directory, e.g.:
+
+    python manage.py bootstrap
+    python manage.py migrate
+    python manage.py check-query-plans
+    python manage.py check-query-budgets
+    python manage.py rebuild-search
+    python manage.py check-payments --repair
+    python manage.py rebuild-earnings
+    python manage.py rebuild-stats
+    python manage.py rebuild-read-model
+    python manage.py prune-changes
+    python manage.py prune-idempotency-keys
+    python manage.py run-jobs
+    python manage.py import candidates export.csv
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from database import SessionLocal, engine
+import bootstrap
+import bulk_import
+import change_feed
+import earnings_rollup
+import idempotency
+import jobs
+import migrations
+import payment_cache
+import pipeline_stats
+import query_plans
+import read_model
+import search_index
+
+
+def bootstrap_db(args: argparse.Namespace) -> None:
+    """Migrate, install the search index, seed and backfill; run once per deploy."""
+    applied = bootstrap.run(engine)
+    if applied:
+        print(f"Applied migrations: {', '.join(map(str, applied))}")
+    print(f"Database is ready (schema version {migrations.LATEST})")
+
+
+def migrate(args: argparse.Namespace) -> None:
+    """Apply pending schema migrations."""
+    applied = migrations.upgrade(engine)
+    if applied:
+        print(f"Applied migrations: {', '.join(map(str, applied))}")
+    else:
+        print(f"Schema is up to date (version {migrations.LATEST})")
+
+
+def check_query_plans(args: argparse.Namespace) -> None:
+    """Fail if a hot query plan falls back to a full table scan."""
+    if engine.dialect.name != "sqlite":
+        print("Query plan check is only implemented for SQLite")
+        return
+    migrations.upgrade(engine)
+    problems = query_plans.check(engine)
+    for name, plan in problems.items():
+        print(f"{name}: full table scan")
+        for line in plan:
+            print(f"    {line}")
+    if problems:
+        sys.exit(1)
+    print(f"All {len(query_plans.hot_queries())} hot queries use indexes")
+
+
+def check_query_budgets(args: argparse.Namespace) -> None:
+    """Run the route budget scenario against a throwaway SQLite database."""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/budgets.db")
+        script = Path(__file__).resolve().parent / "route_budgets.py"
+        code = subprocess.run([sys.executable, str(script)], cwd=workdir, env=env).returncode
+    if code:
+        sys.exit(code)
+    print("All routes are within their query budgets")
+
+
+def rebuild_search(args: argparse.Namespace) -> None:
+    """Re-index all candidates, vacancies, clients and recruiters."""
+    migrations.upgrade(engine)
+    if not search_index.install(engine):
+        print("FTS5 is not available for this database; search uses LIKE matching")
+        return
+    search_index.rebuild(engine)
+    print("Search index rebuilt")
+
+
+def check_payments(args: argparse.Namespace) -> None:
+    """Report (and optionally repair) drift between payments and the cache."""
+    db = SessionLocal()
+    try:
+        drift = payment_cache.find_drift(db)
+        for d in drift:
+            print(
+                f"application {d.application_id}: cached {d.cached_amount} "
+                f"({d.cached_paid_date}, paid={d.cached_paid}), "
+                f"actual {d.actual_amount} ({d.actual_paid_date})"
+            )
+        print(f"{len(drift)} application(s) with drifted payment cache")
+        if drift and args.repair:
+            repaired = payment_cache.repair(db, [d.application_id for d in drift])
+            print(f"Repaired {repaired} application(s)")
+    finally:
+        db.close()
+
+
+def rebuild_earnings(args: argparse.Namespace) -> None:
+    """Recompute the monthly earnings rollup from all payments."""
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        earnings_rollup.rebuild(db)
+        print("Earnings rollup rebuilt")
+    finally:
+        db.close()
+
+
+def rebuild_stats(args: argparse.Namespace) -> None:
+    """Recompute the pipeline funnel counters from all applications."""
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        pipeline_stats.rebuild(db)
+        print("Pipeline funnel counters rebuilt")
+    finally:
+        db.close()
+
+
+def rebuild_read_model(args: argparse.Namespace) -> None:
+    """Recompute the denormalized pipeline read model from the source tables."""
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        read_model.rebuild(db)
+        print("Pipeline read model rebuilt")
+    finally:
+        db.close()
+
+
+def prune_changes(args: argparse.Namespace) -> None:
+    """Delete pipeline change log entries older than the retention period."""
+    migrations.upgrade(engine)
+    deleted = change_feed.prune()
+    print(f"Deleted {deleted} change log entries older than {change_feed.RETENTION}")
+
+
+def prune_idempotency_keys(args: argparse.Namespace) -> None:
+    """Delete expired Idempotency-Key responses."""
+    migrations.upgrade(engine)
+    print(f"Deleted {idempotency.prune()} expired idempotency keys")
+
+
+def run_jobs(args: argparse.Namespace) -> None:
+    """Work on background jobs in this process until interrupted, or until none is queued."""
+    migrations.upgrade(engine)
+    if args.once:
+        print(f"Ran {jobs.run_pending()} job(s)")
+        return
+    runner = jobs.Runner(args.workers)
+    runner.start()
+    print(f"Running jobs with {args.workers} worker(s); press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        # Running jobs are requeued at their next progress report
+        runner.stop()
+
+
+def import_file(args: argparse.Namespace) -> None:
+    """Stream a CSV or JSONL file into the database and print the report."""
+    migrations.upgrade(engine)
+    search_index.install(engine)
+    fmt = bulk_import.detect_format(args.path, args.format)
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            result = bulk_import.IMPORTERS[args.kind](
+                db, bulk_import.iter_records(stream, fmt), batch_size=args.batch_size
+            )
+    finally:
+        db.close()
+    for error in result.errors:
+        print(json.dumps(error, ensure_ascii=False))
+    print(f"Inserted {result.inserted}, failed {result.failed}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recruiting CRM maintenance tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "bootstrap", help="prepare the database for serving (migrations, search, seed data)"
+    ).set_defaults(func=bootstrap_db)
+    commands.add_parser("migrate", help="apply pending schema migrations").set_defaults(
+        func=migrate
+    )
+    commands.add_parser(
+        "check-query-plans", help="fail if a hot query does a full table scan"
+    ).set_defaults(func=check_query_plans)
+    commands.add_parser(
+        "check-query-budgets", help="fail if a route runs more SQL statements than pinned"
+    ).set_defaults(func=check_query_budgets)
+
+    commands.add_parser(
+        "rebuild-search", help="rebuild the full-text search index"
+    ).set_defaults(func=rebuild_search)
+
+    check = commands.add_parser(
+        "check-payments", help="find applications whose cached payment fields drifted"
+    )
+    check.add_argument("--repair", action="store_true", help="recompute drifted rows")
+    check.set_defaults(func=check_payments)
+
+    commands.add_parser(
+        "rebuild-earnings", help="recompute the monthly earnings rollup"
+    ).set_defaults(func=rebuild_earnings)
+
+    commands.add_parser(
+        "rebuild-stats", help="recompute the pipeline funnel counters"
+    ).set_defaults(func=rebuild_stats)
+
+    commands.add_parser(
+        "rebuild-read-model", help="recompute the denormalized pipeline read model"
+    ).set_defaults(func=rebuild_read_model)
+
+    commands.add_parser(
+        "prune-changes", help="delete old entries of the pipeline change log"
+    ).set_defaults(func=prune_changes)
+
+    commands.add_parser(
+        "prune-idempotency-keys", help="delete expired Idempotency-Key responses"
+    ).set_defaults(func=prune_idempotency_keys)
+
+    worker = commands.add_parser("run-jobs", help="run queued background jobs")
+    worker.add_argument("--workers", type=int, default=max(jobs.WORKERS, 1))
+    worker.add_argument(
+        "--once", action="store_true", help="run queued jobs one by one, then exit"
+    )
+    worker.set_defaults(func=run_jobs)
+
+    importer = commands.add_parser(
+        "import", help="bulk-import candidates or applications from CSV/JSONL"
+    )
+    importer.add_argument("kind", choices=sorted(bulk_import.IMPORTERS))
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=bulk_import.FORMATS)
+    importer.add_argument("--batch-size", type=int, default=bulk_import.BATCH_SIZE)
+    importer.set_defaults(func=import_file)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
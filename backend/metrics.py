@@ -0,0 +1,230 @@
+"""
+Request-level performance metrics in the Prometheus text format.
+
+`MetricsMiddleware` times every request and attributes to its route the
+number of SQL statements and the time spent in them (through cursor event
+hooks that `instrument_engine` installs on the engines in database.py), the
+time spent encoding response bodies, and the response size. `render`
+produces the `/metrics` exposition.
+
+With `SLOW_REQUEST_MS` set, requests slower than that are logged to the
+"srm.slow" logger together with their slowest SQL statements.
+
+Metrics are kept per process; with several workers each one exposes its
+own counters and the scraper aggregates them.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import Engine, event
+
+slow_log = logging.getLogger("srm.slow")
+
+# Upper bounds in seconds of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Statements kept per request for the slow log
+MAX_STATEMENTS = 200
+
+
+@dataclass
+class RequestStats:
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+    statements: list[tuple[float, str]] | None = None
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+@dataclass
+class _RouteMetrics:
+    buckets: list[int] = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+    count: int = 0
+    seconds: float = 0.0
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+    response_bytes: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[tuple[str, str], _RouteMetrics] = {}
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats
+    ) -> None:
+        with self._lock:
+            metrics = self._routes.setdefault((method, route), _RouteMetrics())
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    metrics.buckets[i] += 1
+                    break
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.sql_count += stats.sql_count
+            metrics.sql_seconds += stats.sql_seconds
+            metrics.serialization_seconds += stats.serialization_seconds
+            metrics.response_bytes += size
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def render(self) -> str:
+        """The registry in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), m in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                cumulative = 0
+                for bound, n in zip(DURATION_BUCKETS, m.buckets):
+                    cumulative += n
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.seconds:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.count}")
+
+            lines += [
+                "# HELP http_requests_total Requests by route and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), m in routes:
+                for status, n in sorted(m.statuses.items()):
+                    lines.append(
+                        f'http_requests_total{{method="{method}",route="{_escape(route)}",'
+                        f'status="{status}"}} {n}'
+                    )
+
+            for name, kind, help_text, attr, fmt in (
+                ("http_request_sql_queries_total", "counter", "SQL statements executed.", "sql_count", "{}"),
+                ("http_request_sql_seconds_total", "counter", "Time spent in SQL.", "sql_seconds", "{:.6f}"),
+                (
+                    "http_request_serialization_seconds_total",
+                    "counter",
+                    "Time spent encoding response bodies.",
+                    "serialization_seconds",
+                    "{:.6f}",
+                ),
+                ("http_response_size_bytes_total", "counter", "Response body bytes sent.", "response_bytes", "{}"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for (method, route), m in routes:
+                    value = fmt.format(getattr(m, attr))
+                    lines.append(f'{name}{{method="{method}",route="{_escape(route)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = Registry()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count the statements `engine` executes and their time against the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _current.get()
+        if stats is None:
+            return
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < MAX_STATEMENTS:
+            stats.statements.append((elapsed, statement))
+
+
+@contextmanager
+def serializing():
+    """Attribute the time spent in the block to response serialization."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialization_seconds += time.perf_counter() - started
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records its encoding time; the app's default response class."""
+
+    def render(self, content) -> bytes:
+        with serializing():
+            return super().render(content)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are measured until the last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(statements=[] if SLOW_REQUEST_MS > 0 else None)
+        token = _current.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - started
+            _current.reset(token)
+            # Label by route template so path parameters do not explode the series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe(scope["method"], route, status, seconds, size, stats)
+            if stats.statements is not None and seconds * 1000 >= SLOW_REQUEST_MS:
+                _log_slow(scope, status, seconds, stats)
+
+
+def _log_slow(scope, status: int, seconds: float, stats: RequestStats) -> None:
+    query = scope.get("query_string", b"").decode("latin-1")
+    slowest = sorted(stats.statements, reverse=True)[:5]
+    slow_log.warning(
+        "%s %s%s -> %s in %.1f ms, %d SQL statements in %.1f ms, serialization %.1f ms%s",
+        scope["method"],
+        scope["path"],
+        "?" + query if query else "",
+        status,
+        seconds * 1000,
+        stats.sql_count,
+        stats.sql_seconds * 1000,
+        stats.serialization_seconds * 1000,
+        "".join(f"\n  {elapsed * 1000:.1f} ms: {' '.join(sql.split())}" for elapsed, sql in slowest),
+    )
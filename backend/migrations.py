@@ -0,0 +1,153 @@
+"""
+Versioned schema migrations.
+
+The applied version is stored in the `schema_version` table. `upgrade`
+applies every pending migration in order, each in its own transaction.
+A brand-new database is created from the models with `create_all` and
+stamped with the latest version, so migrations only ever run against
+databases that already hold data.
+
+To change the schema, update models.py and append a migration that brings
+an existing database to the same state. Migrations are never edited once
+released.
+"""
+
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    select,
+)
+
+from database import Base
+import models
+
+# Kept out of Base.metadata so create_all of the models never touches it
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _initial_schema(conn: Connection) -> None:
+    # Databases created before migrations existed may miss tables added
+    # later (e.g. the earnings rollup); create_all only adds what is missing.
+    Base.metadata.create_all(conn)
+
+
+def _hot_path_indexes(conn: Connection) -> None:
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS ix_applications_created_at_id "
+        "ON applications (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_applications_status_created_at "
+        "ON applications (status, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_applications_recruiter_created_at "
+        "ON applications (recruiter_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_applications_vacancy_created_at "
+        "ON applications (vacancy_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_payments_paid_date_created_at "
+        "ON payments (paid_date, created_at)",
+        # Superseded by the composite indexes above (same leading column)
+        "DROP INDEX IF EXISTS ix_applications_status",
+        "DROP INDEX IF EXISTS ix_applications_recruiter_id",
+        "DROP INDEX IF EXISTS ix_applications_vacancy_id",
+        "DROP INDEX IF EXISTS ix_payments_paid_date",
+    ):
+        conn.exec_driver_sql(ddl)
+
+
+def _data_versions(conn: Connection) -> None:
+    models.DataVersion.__table__.create(conn, checkfirst=True)
+
+
+def _pipeline_stats(conn: Connection) -> None:
+    # Filled from the applications table on the next startup
+    models.PipelineStat.__table__.create(conn, checkfirst=True)
+
+
+def _change_log(conn: Connection) -> None:
+    models.ChangeLog.__table__.create(conn, checkfirst=True)
+
+
+def _application_updated_at(conn: Connection) -> None:
+    column_type = models.Application.__table__.c.updated_at.type.compile(conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE applications ADD COLUMN updated_at {column_type}")
+    conn.exec_driver_sql("UPDATE applications SET updated_at = created_at")
+
+
+def _pipeline_rows(conn: Connection) -> None:
+    # Filled from the applications table on the next bootstrap
+    models.PipelineRow.__table__.create(conn, checkfirst=True)
+
+
+def _jobs(conn: Connection) -> None:
+    models.Job.__table__.create(conn, checkfirst=True)
+
+
+def _idempotency_keys(conn: Connection) -> None:
+    models.IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial schema", _initial_schema),
+    (2, "composite indexes for pipeline filters and earnings reports", _hot_path_indexes),
+    (3, "per-table data versions for ETags", _data_versions),
+    (4, "pipeline funnel counters", _pipeline_stats),
+    (5, "pipeline change feed", _change_log),
+    (6, "application updated_at", _application_updated_at),
+    (7, "pipeline read model", _pipeline_rows),
+    (8, "background jobs", _jobs),
+    (9, "idempotency keys", _idempotency_keys),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    """Return the applied schema version, 0 for a pre-migration database."""
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.scalar(select(schema_version.c.version).order_by(schema_version.c.version.desc())) or 0
+
+
+def _record(conn: Connection, version: int, description: str) -> None:
+    conn.execute(
+        schema_version.insert().values(
+            version=version, description=description, applied_at=datetime.utcnow()
+        )
+    )
+
+
+def upgrade(engine: Engine) -> list[int]:
+    """Bring the database to the latest version. Returns the applied versions."""
+    with engine.begin() as conn:
+        fresh = not inspect(conn).has_table("applications")
+        version_metadata.create_all(conn)
+        if fresh:
+            Base.metadata.create_all(conn)
+            _record(conn, LATEST, "created from models")
+            return [LATEST]
+        version = current_version(conn)
+
+    applied = []
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            _record(conn, number, description)
+        applied.append(number)
+    return applied
@@ -2,10 +2,12 @@
 SQLAlchemy models defining the database schema for the recruiting CRM.
 
 This module contains ORM classes for Clients, Recruiters, Vacancies, Candidates,
-Applications and Payments. Applications reference a candidate, vacancy and recruiter.
-Payments are associated with an application and allow tracking multiple partial
-payments. Applications cache the total payment amount and last payment date
-for quick access.
+Applications and Payments, plus the EarningsRollup and PipelineStat reporting
+tables, the DataVersion change counters, the ChangeLog feed, the PipelineRow
+read model, background Jobs and stored IdempotencyKeys. Applications reference a
+candidate, vacancy and recruiter. Payments are associated with an application
+and allow tracking multiple partial payments. Applications cache the total
+payment amount and last payment date for quick access.
 """
 
 from datetime import datetime, date
@@ -18,6 +20,7 @@ from sqlalchemy import (
     ForeignKey,
     Float,
     Text,
+    Index,
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from database import Base
@@ -94,6 +97,16 @@ class Application(Base):
     """
 
     __tablename__ = "applications"
+    __table_args__ = (
+        # Backs the pipeline sort order and keyset pagination on (created_at, id)
+        Index("ix_applications_created_at_id", "created_at", "id"),
+        # Pipeline filters, each followed by the pipeline sort order so a
+        # filtered page is a single index range scan. The leading columns also
+        # serve plain lookups by status / recruiter / vacancy.
+        Index("ix_applications_status_created_at", "status", "created_at", "id"),
+        Index("ix_applications_recruiter_created_at", "recruiter_id", "created_at", "id"),
+        Index("ix_applications_vacancy_created_at", "vacancy_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -101,13 +114,11 @@ class Application(Base):
     candidate_id: Mapped[int] = mapped_column(
         ForeignKey("candidates.id"), index=True
     )
-    vacancy_id: Mapped[int] = mapped_column(ForeignKey("vacancies.id"), index=True)
-    recruiter_id: Mapped[int] = mapped_column(
-        ForeignKey("recruiters.id"), index=True
-    )
+    vacancy_id: Mapped[int] = mapped_column(ForeignKey("vacancies.id"))
+    recruiter_id: Mapped[int] = mapped_column(ForeignKey("recruiters.id"))
 
     date_contacted: Mapped[date] = mapped_column(Date, index=True)
-    status: Mapped[str] = mapped_column(String(40), index=True)  # new, in_process, rejected, hired
+    status: Mapped[str] = mapped_column(String(40))  # new, in_process, rejected, hired
 
     rejection_date: Mapped[date | None] = mapped_column(Date, nullable=True)
     start_date: Mapped[date | None] = mapped_column(Date, nullable=True)
@@ -125,6 +136,10 @@ class Application(Base):
     replacement_note: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Set on every UPDATE, including bulk status changes and payment totals
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
 
     # Relationships
     candidate = relationship("Candidate", back_populates="applications")
@@ -147,6 +162,10 @@ class Payment(Base):
     """
 
     __tablename__ = "payments"
+    __table_args__ = (
+        # Earnings reports: paid_date range ordered by (paid_date, created_at)
+        Index("ix_payments_paid_date_created_at", "paid_date", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -154,10 +173,194 @@ class Payment(Base):
     application_id: Mapped[int] = mapped_column(
         ForeignKey("applications.id"), index=True
     )
-    paid_date: Mapped[date] = mapped_column(Date, index=True)
+    paid_date: Mapped[date] = mapped_column(Date)
     amount: Mapped[float] = mapped_column(Float, default=0.0)
     note: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    application = relationship("Application", back_populates="payments")
\ No newline at end of file
+    application = relationship("Application", back_populates="payments")
+
+
+class EarningsRollup(Base):
+    """
+    Pre-aggregated payment totals per month, client and recruiter.
+    Maintained by the payment write paths so earnings reports can be served
+    without scanning the payments table.
+    """
+
+    __tablename__ = "earnings_rollup"
+
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    client_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    recruiter_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+
+    total: Mapped[float] = mapped_column(Float, default=0.0)
+    payment_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class PipelineStat(Base):
+    """
+    Application counts per client, vacancy, recruiter, status and outcome
+    duration. `days` is the time from first contact to the start date (hired)
+    or to the rejection date (rejected), and NO_DAYS for other statuses or
+    a missing date. Maintained by the application write paths so funnel
+    statistics never scan the applications table.
+    """
+
+    __tablename__ = "pipeline_stats"
+
+    NO_DAYS = -1
+
+    client_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    vacancy_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    recruiter_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status: Mapped[str] = mapped_column(String(40), primary_key=True)
+    days: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class DataVersion(Base):
+    """
+    Change counter per table, bumped in the same transaction as every write
+    to that table. Drives the ETags of the list and report endpoints.
+    """
+
+    __tablename__ = "data_versions"
+
+    table_name: Mapped[str] = mapped_column(String(60), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class ChangeLog(Base):
+    """
+    Append-only feed of pipeline row changes: one entry per application
+    inserted or changed ("upsert") or deleted ("delete"), written in the
+    same transaction as the change. `seq` orders the feed and is what clients
+    resume from; the client and recruiter ids let subscribers filter entries
+    whose application no longer exists.
+    """
+
+    __tablename__ = "change_log"
+    # Never reuse a sequence number, even after the newest entries are deleted
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    application_id: Mapped[int] = mapped_column(Integer)
+    client_id: Mapped[int] = mapped_column(Integer)
+    recruiter_id: Mapped[int] = mapped_column(Integer)
+    op: Mapped[str] = mapped_column(String(10))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class PipelineRow(Base):
+    """
+    Denormalized pipeline read model: one row per application with the
+    columns of `ApplicationRow`, names included, kept current by the write
+    paths (see read_model.py). Each index leads with a filter combination and
+    ends with the pipeline sort order, so a filtered page is a single range
+    scan that stops after `limit` rows.
+    """
+
+    __tablename__ = "pipeline_rows"
+    __table_args__ = (
+        Index("ix_pipeline_rows_created_at", "created_at", "id"),
+        Index("ix_pipeline_rows_status", "status", "created_at", "id"),
+        Index("ix_pipeline_rows_client", "client_id", "created_at", "id"),
+        Index("ix_pipeline_rows_client_status", "client_id", "status", "created_at", "id"),
+        Index("ix_pipeline_rows_recruiter", "recruiter_id", "created_at", "id"),
+        Index("ix_pipeline_rows_recruiter_status", "recruiter_id", "status", "created_at", "id"),
+    )
+
+    # Same as the application id
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    date_contacted: Mapped[date] = mapped_column(Date)
+    status: Mapped[str] = mapped_column(String(40))
+    rejection_date: Mapped[date | None] = mapped_column(Date, nullable=True)
+    start_date: Mapped[date | None] = mapped_column(Date, nullable=True)
+    paid: Mapped[bool] = mapped_column(Boolean)
+    paid_date: Mapped[date | None] = mapped_column(Date, nullable=True)
+    payment_amount: Mapped[float] = mapped_column(Float)
+    is_replacement: Mapped[bool] = mapped_column(Boolean)
+    replacement_of_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    replacement_note: Mapped[str | None] = mapped_column(Text, nullable=True)
+    candidate_id: Mapped[int] = mapped_column(Integer)
+    candidate_name: Mapped[str] = mapped_column(String(180))
+    recruiter_id: Mapped[int] = mapped_column(Integer)
+    recruiter_name: Mapped[str] = mapped_column(String(120))
+    vacancy_id: Mapped[int] = mapped_column(Integer)
+    vacancy_title: Mapped[str] = mapped_column(String(180))
+    vacancy_fee: Mapped[float] = mapped_column(Float)
+    client_id: Mapped[int] = mapped_column(Integer)
+    client_name: Mapped[str] = mapped_column(String(120))
+    # The application's created_at, for the pipeline sort order
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+class Job(Base):
+    """
+    A background job (see jobs.py). Workers claim queued jobs by switching
+    them to running and refresh `heartbeat_at` while they work on them, so
+    jobs of a worker that died are handed to another one.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claiming scans queued jobs oldest first; listings filter by status
+        Index("ix_jobs_status_id", "status", "id"),
+    )
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(40))
+    # JSON-encoded parameters and result; the result can be large and is
+    # only loaded by GET /jobs/{id}/result
+    params: Mapped[str] = mapped_column(Text, default="{}")
+    result: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
+    status: Mapped[str] = mapped_column(String(20), default=QUEUED)
+    # Progress as `done` out of `total` steps (total unknown while None)
+    done: Mapped[int] = mapped_column(Integer, default=0)
+    total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    message: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+    # host:pid of the worker running the job
+    worker: Mapped[str | None] = mapped_column(String(80), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class IdempotencyKey(Base):
+    """
+    A client-chosen Idempotency-Key of a write request and, once it
+    completed, the response to replay for retries (see idempotency.py).
+    `status_code` is None while the first request is still in flight.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    # "POST /applications", so a key only matches requests to the same route
+    route: Mapped[str] = mapped_column(String(100), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # Hash of the request path and body; a retry must send the same request
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    # Identifies the request that holds the key while it is in flight
+    token: Mapped[str] = mapped_column(String(32))
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    body: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
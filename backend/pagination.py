@@ -0,0 +1,34 @@
+"""
+Helpers for keyset (cursor) pagination.
+
+A cursor is an opaque, URL-safe token that encodes the sort key of the last
+row a client has seen: a date or timestamp plus the row id as tie-breaker.
+For the pipeline this is the pair ``(Application.created_at, Application.id)``,
+which matches the composite index on the applications table, so fetching the
+next page is an index range scan no matter how deep the client has scrolled.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(sort_value: date | datetime, row_id: int) -> str:
+    """Encode the sort key of the last returned row into an opaque cursor."""
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by `encode_cursor`. Date sort values come back
+    as midnight datetimes. Raises a 400 error if the token is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
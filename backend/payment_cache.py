@@ -0,0 +1,158 @@
+"""
+Maintenance of the cached payment fields on Application.
+
+`Application.payment_amount`, `paid_date` and `paid` mirror the Payment rows
+of an application. Writes adjust them with a single UPDATE in the same
+transaction as the payment insert or delete instead of re-aggregating all
+payments. `find_drift` and `repair` compare the cache against the Payment
+table in bulk and are used by `manage.py check-payments`.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+import change_feed
+import read_model
+from database import round_money
+from models import Application, Payment
+
+# Amounts are money; tolerate float noise below a cent
+TOLERANCE = 0.005
+
+
+def apply_payment(db: Session, app_id: int, amount: float, paid_date: date) -> bool:
+    """
+    Add a new payment to the cached fields of an application.
+    Returns False if the application does not exist.
+    """
+    new_total = round_money(Application.payment_amount + amount)
+    result = db.execute(
+        update(Application)
+        .where(Application.id == app_id)
+        .values(
+            payment_amount=new_total,
+            paid=new_total > 0,
+            paid_date=case(
+                (
+                    or_(Application.paid_date.is_(None), Application.paid_date < paid_date),
+                    paid_date,
+                ),
+                else_=Application.paid_date,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def revert_payment(db: Session, payment: Payment) -> None:
+    """
+    Remove an already deleted (and flushed) payment from the cached fields.
+    The last payment date is only re-read when the removed payment was the
+    latest one.
+    """
+    new_total = round_money(Application.payment_amount - payment.amount)
+    last_date = (
+        select(func.max(Payment.paid_date))
+        .where(Payment.application_id == payment.application_id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Application)
+        .where(Application.id == payment.application_id)
+        .values(
+            payment_amount=new_total,
+            paid=new_total > 0,
+            paid_date=case(
+                (Application.paid_date == payment.paid_date, last_date),
+                else_=Application.paid_date,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+@dataclass
+class Drift:
+    application_id: int
+    cached_amount: float
+    cached_paid_date: date | None
+    cached_paid: bool
+    actual_amount: float
+    actual_paid_date: date | None
+
+
+def _totals():
+    return (
+        select(
+            Payment.application_id,
+            func.sum(Payment.amount).label("total"),
+            func.max(Payment.paid_date).label("last_date"),
+        )
+        .group_by(Payment.application_id)
+        .subquery()
+    )
+
+
+def find_drift(db: Session) -> list[Drift]:
+    """Return every application whose cached fields disagree with its payments."""
+    totals = _totals()
+    actual = func.coalesce(totals.c.total, 0.0)
+    stmt = (
+        select(
+            Application.id,
+            Application.payment_amount,
+            Application.paid_date,
+            Application.paid,
+            actual,
+            totals.c.last_date,
+        )
+        .outerjoin(totals, totals.c.application_id == Application.id)
+        .where(
+            or_(
+                func.abs(Application.payment_amount - actual) > TOLERANCE,
+                Application.paid_date.is_distinct_from(totals.c.last_date),
+                Application.paid != (round_money(actual) > 0),
+            )
+        )
+        .order_by(Application.id)
+    )
+    return [Drift(*row) for row in db.execute(stmt)]
+
+
+def repair(db: Session, app_ids: list[int], batch_size: int = 500) -> int:
+    """
+    Recompute the cached fields from the Payment table for the given
+    applications with set-based updates. Returns the number of rows updated.
+    """
+    total = (
+        select(func.coalesce(func.sum(Payment.amount), 0.0))
+        .where(Payment.application_id == Application.id)
+        .scalar_subquery()
+    )
+    last_date = (
+        select(func.max(Payment.paid_date))
+        .where(Payment.application_id == Application.id)
+        .scalar_subquery()
+    )
+    updated = 0
+    for start in range(0, len(app_ids), batch_size):
+        batch = app_ids[start:start + batch_size]
+        result = db.execute(
+            update(Application)
+            .where(Application.id.in_(batch))
+            .values(
+                payment_amount=round_money(total),
+                paid_date=last_date,
+                paid=round_money(total) > 0,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+        read_model.refresh(db, Application.id.in_(batch))
+        change_feed.record(db, Application.id.in_(batch))
+    db.commit()
+    return updated
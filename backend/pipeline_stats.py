@@ -0,0 +1,207 @@
+"""
+Maintenance and queries of the pipeline funnel counters.
+
+`PipelineStat` holds application counts per (client, vacancy, recruiter,
+status, days), where `days` is the time to the outcome of a hired or rejected
+application. Every write path that creates, changes or removes applications
+calls `apply` in its own transaction, like the earnings rollup. Funnel
+statistics, including the time-to-hire and time-to-rejection distributions,
+are then computed from the counters alone, so their cost depends on the
+number of distinct keys rather than on the number of applications.
+"""
+
+from collections import defaultdict
+from typing import Literal
+
+from sqlalchemy import case, delete, exists, func, select
+from sqlalchemy.orm import Session
+
+from database import days_between, upsert
+from models import Application, PipelineStat, Vacancy
+from schemas import DurationBucket, DurationStats, FunnelGroup, FunnelStats
+from validation import VALID_STATUSES
+
+# Lower bounds in days of the duration histogram buckets
+BUCKETS = (0, 8, 15, 31, 61, 91)
+
+GroupBy = Literal["client", "vacancy", "recruiter"]
+_GROUP_COLUMNS = {
+    "client": PipelineStat.client_id,
+    "vacancy": PipelineStat.vacancy_id,
+    "recruiter": PipelineStat.recruiter_id,
+}
+
+
+def _outcome_days():
+    """Days from first contact to the outcome date, NO_DAYS if there is none."""
+    outcome = case(
+        (Application.status == "hired", Application.start_date),
+        (Application.status == "rejected", Application.rejection_date),
+    )
+    days = days_between(Application.date_contacted, outcome)
+    # An outcome dated before the first contact counts as the same day
+    return func.coalesce(case((days < 0, 0), else_=days), PipelineStat.NO_DAYS)
+
+
+def _grouped_applications(*criteria):
+    """Application counts grouped by counter key for applications matching `criteria`."""
+    days = _outcome_days()
+    return (
+        select(
+            Vacancy.client_id,
+            Application.vacancy_id,
+            Application.recruiter_id,
+            Application.status,
+            days.label("days"),
+            func.count(Application.id).label("count"),
+        )
+        .join(Vacancy, Vacancy.id == Application.vacancy_id)
+        .where(*criteria)
+        .group_by(
+            Vacancy.client_id,
+            Application.vacancy_id,
+            Application.recruiter_id,
+            Application.status,
+            days,
+        )
+    )
+
+
+def apply(db: Session, *criteria, sign: int = 1) -> None:
+    """
+    Add (sign=1) or subtract (sign=-1) the applications matching `criteria`.
+    Call it after new or changed applications are flushed, and before
+    applications are changed or deleted, within the same transaction.
+    Criteria may refer to Application and Vacancy columns.
+    """
+    groups = db.execute(_grouped_applications(*criteria)).all()
+    for group in groups:
+        stmt = upsert(PipelineStat).values(
+            client_id=group.client_id,
+            vacancy_id=group.vacancy_id,
+            recruiter_id=group.recruiter_id,
+            status=group.status,
+            days=group.days,
+            count=sign * group.count,
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["client_id", "vacancy_id", "recruiter_id", "status", "days"],
+                set_={"count": PipelineStat.count + stmt.excluded.count},
+            )
+        )
+    if sign < 0 and groups:
+        db.execute(delete(PipelineStat).where(PipelineStat.count <= 0))
+
+
+def rebuild(db: Session) -> None:
+    """Recompute all counters from the applications table."""
+    db.execute(delete(PipelineStat))
+    apply(db)
+    db.commit()
+
+
+def ensure_populated(db: Session) -> None:
+    """Build the counters once for databases that had applications before they existed."""
+    if db.scalar(select(exists().select_from(PipelineStat))):
+        return
+    if db.scalar(select(exists().select_from(Application))):
+        rebuild(db)
+
+
+def _duration_stats(histogram: dict[int, int]) -> DurationStats:
+    """Summary of a {days: count} histogram."""
+    count = sum(histogram.values())
+    if not count:
+        return DurationStats(
+            count=0, mean_days=None, median_days=None, p90_days=None, buckets=[]
+        )
+
+    def percentile(q: float) -> int:
+        rank = q * (count - 1)
+        seen = 0
+        for days in sorted(histogram):
+            seen += histogram[days]
+            if seen > rank:
+                return days
+        return max(histogram)
+
+    buckets = []
+    for low, high in zip(BUCKETS, (*BUCKETS[1:], None)):
+        buckets.append(
+            DurationBucket(
+                min_days=low,
+                max_days=None if high is None else high - 1,
+                count=sum(n for d, n in histogram.items() if d >= low and (high is None or d < high)),
+            )
+        )
+    return DurationStats(
+        count=count,
+        mean_days=round(sum(d * n for d, n in histogram.items()) / count, 1),
+        median_days=percentile(0.5),
+        p90_days=percentile(0.9),
+        buckets=buckets,
+    )
+
+
+def _funnel_group(group_id: int | None, name: str | None, rows) -> FunnelGroup:
+    by_status = dict.fromkeys(sorted(VALID_STATUSES), 0)
+    durations: dict[str, dict[int, int]] = {"hired": {}, "rejected": {}}
+    for status, days, count in rows:
+        by_status[status] = by_status.get(status, 0) + count
+        if status in durations and days != PipelineStat.NO_DAYS:
+            durations[status][days] = durations[status].get(days, 0) + count
+    total = sum(by_status.values())
+    return FunnelGroup(
+        id=group_id,
+        name=name,
+        total=total,
+        by_status=by_status,
+        hire_rate=round(by_status["hired"] / total, 4) if total else 0.0,
+        rejection_rate=round(by_status["rejected"] / total, 4) if total else 0.0,
+        time_to_hire=_duration_stats(durations["hired"]),
+        time_to_rejection=_duration_stats(durations["rejected"]),
+    )
+
+
+def funnel(
+    db: Session,
+    names: dict[int, str],
+    group_by: GroupBy | None = None,
+    client_id: int | None = None,
+    vacancy_id: int | None = None,
+    recruiter_id: int | None = None,
+) -> FunnelStats:
+    """
+    Funnel statistics over the applications matching the filters, overall and
+    per `group_by` entity. `names` maps the grouped entity ids to their names.
+    """
+    key = _GROUP_COLUMNS[group_by] if group_by else None
+    stmt = select(
+        *(() if key is None else (key,)),
+        PipelineStat.status,
+        PipelineStat.days,
+        func.sum(PipelineStat.count),
+    ).group_by(*(() if key is None else (key,)), PipelineStat.status, PipelineStat.days)
+    for column, value in (
+        (PipelineStat.client_id, client_id),
+        (PipelineStat.vacancy_id, vacancy_id),
+        (PipelineStat.recruiter_id, recruiter_id),
+    ):
+        if value is not None:
+            stmt = stmt.where(column == value)
+
+    rows = db.execute(stmt).all()
+    if key is None:
+        return FunnelStats(overall=_funnel_group(None, None, rows), groups=[])
+
+    per_group = defaultdict(list)
+    for group_id, *rest in rows:
+        per_group[group_id].append(rest)
+    return FunnelStats(
+        overall=_funnel_group(None, None, [rest for _, *rest in rows]),
+        groups=sorted(
+            (_funnel_group(gid, names.get(gid), group) for gid, group in per_group.items()),
+            key=lambda g: (-g.total, g.name or ""),
+        ),
+    )
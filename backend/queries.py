@@ -0,0 +1,110 @@
+"""
+Query builders for the pipeline and earnings read paths.
+
+They are shared by the JSON endpoints, the streaming exports and the query
+plan check in manage.py, so all of them run the exact same SQL.
+"""
+
+from sqlalchemy import or_, select
+
+import search_index
+from models import Application, Candidate, Client, Payment, Recruiter, Vacancy
+
+
+def build_pipeline_query(
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    status: str | None = None,
+    search: str | None = None,
+):
+    """
+    Build the flattened pipeline select with the optional filters applied.
+    Rows are ordered newest first by (created_at, id) so the order is stable
+    and can be resumed from a keyset cursor.
+    """
+    stmt = (
+        select(
+            Application.id,
+            Application.date_contacted,
+            Application.status,
+            Application.rejection_date,
+            Application.start_date,
+            Application.paid,
+            Application.paid_date,
+            Application.payment_amount,
+            Application.is_replacement,
+            Application.replacement_of_id,
+            Application.replacement_note,
+
+            Candidate.id.label("candidate_id"),
+            Candidate.full_name.label("candidate_name"),
+
+            Recruiter.id.label("recruiter_id"),
+            Recruiter.name.label("recruiter_name"),
+
+            Vacancy.id.label("vacancy_id"),
+            Vacancy.title.label("vacancy_title"),
+            Vacancy.fee_amount.label("vacancy_fee"),
+
+            Client.id.label("client_id"),
+            Client.name.label("client_name"),
+        )
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .join(Recruiter, Recruiter.id == Application.recruiter_id)
+        .join(Vacancy, Vacancy.id == Application.vacancy_id)
+        .join(Client, Client.id == Vacancy.client_id)
+        .order_by(Application.created_at.desc(), Application.id.desc())
+    )
+
+    if client_id is not None:
+        stmt = stmt.where(Client.id == client_id)
+    if recruiter_id is not None:
+        stmt = stmt.where(Recruiter.id == recruiter_id)
+    if status is not None:
+        stmt = stmt.where(Application.status == status)
+    expr = (
+        search_index.match_expression(search, name_only=True)
+        if search and search_index.enabled
+        else None
+    )
+    if expr:
+        stmt = stmt.where(
+            or_(
+                Candidate.id.in_(search_index.matching_ids(search_index.CANDIDATE, expr)),
+                Vacancy.id.in_(search_index.matching_ids(search_index.VACANCY, expr)),
+                Client.id.in_(search_index.matching_ids(search_index.CLIENT, expr)),
+                Recruiter.id.in_(search_index.matching_ids(search_index.RECRUITER, expr)),
+            )
+        )
+    elif search:
+        like = f"%{search.strip()}%"
+        stmt = stmt.where(
+            or_(
+                Candidate.full_name.ilike(like),
+                Vacancy.title.ilike(like),
+                Client.name.ilike(like),
+                Recruiter.name.ilike(like),
+            )
+        )
+    return stmt
+
+
+def earnings_items_query():
+    """Itemized payments joined with the names shown in earnings reports."""
+    return (
+        select(
+            Payment.id.label("payment_id"),
+            Payment.paid_date,
+            Payment.amount.label("amount"),
+            Candidate.full_name.label("candidate_name"),
+            Client.name.label("client_name"),
+            Vacancy.title.label("vacancy_title"),
+            Recruiter.name.label("recruiter_name"),
+            Application.id.label("application_id"),
+        )
+        .join(Application, Application.id == Payment.application_id)
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .join(Recruiter, Recruiter.id == Application.recruiter_id)
+        .join(Vacancy, Vacancy.id == Application.vacancy_id)
+        .join(Client, Client.id == Vacancy.client_id)
+    )
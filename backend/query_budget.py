@@ -0,0 +1,107 @@
+"""
+Query budgets and lazy-load detection.
+
+`query_budget(n)` is a context manager and decorator that fails with
+`QueryBudgetExceeded` when the code inside runs more than `n` SQL
+statements. Statements are counted by cursor hooks on the engines
+(installed by database.py) and attributed through a context variable, so
+budgets also cover endpoint code running in FastAPI's threadpool and are
+not affected by other concurrent requests.
+
+With `LAZY_LOAD_WARNINGS=1` (development), a `LazyLoadWarning` is issued
+whenever a relationship is lazy-loaded while FastAPI serializes a response,
+the classic source of N+1 queries. `warnings.simplefilter("error",
+LazyLoadWarning)` turns them into errors.
+
+route_budgets.py pins a budget for every API route.
+"""
+
+import os
+import warnings
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+
+LAZY_LOAD_WARNINGS = os.getenv("LAZY_LOAD_WARNINGS", "0") == "1"
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, label: str, budget: int, statements: list[str]):
+        self.label = label
+        self.budget = budget
+        self.statements = statements
+        listing = "".join(f"\n  {' '.join(sql.split())[:200]}" for sql in statements)
+        super().__init__(
+            f"{label}: {len(statements)} SQL statements, budget is {budget}{listing}"
+        )
+
+
+class LazyLoadWarning(UserWarning):
+    pass
+
+
+_active: ContextVar[tuple["query_budget", ...]] = ContextVar("query_budgets", default=())
+
+
+class query_budget(ContextDecorator):
+    """Allow at most `max_statements` SQL statements inside the block."""
+
+    def __init__(self, max_statements: int, label: str = "query budget"):
+        self.max_statements = max_statements
+        self.label = label
+        self.statements: list[str] = []
+
+    def __enter__(self) -> "query_budget":
+        self.statements = []
+        self._token = _active.set((*_active.get(), self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _active.reset(self._token)
+        if exc_type is None and len(self.statements) > self.max_statements:
+            raise QueryBudgetExceeded(self.label, self.max_statements, self.statements)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count the statements `engine` executes against the active budgets."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        for budget in _active.get():
+            budget.statements.append(statement)
+
+
+_serializing: ContextVar[bool] = ContextVar("serializing_response", default=False)
+
+
+if LAZY_LOAD_WARNINGS:
+    import fastapi.routing
+
+    # FastAPI validates the endpoint's return value in serialize_response, on
+    # the threadpool for sync endpoints; flag that phase for the ORM hook.
+    # Development only: this wraps a FastAPI internal.
+    _serialize_response = fastapi.routing.serialize_response
+
+    async def _flagged_serialize_response(**kwargs):
+        token = _serializing.set(True)
+        try:
+            return await _serialize_response(**kwargs)
+        finally:
+            _serializing.reset(token)
+
+    fastapi.routing.serialize_response = _flagged_serialize_response
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _warn_lazy_load(state) -> None:
+        if state.is_relationship_load and _serializing.get():
+            warnings.warn(
+                f"Lazy load of {state.loader_strategy_path} while serializing a response",
+                LazyLoadWarning,
+                stacklevel=2,
+            )
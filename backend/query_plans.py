@@ -0,0 +1,85 @@
+"""
+EXPLAIN QUERY PLAN check for the hot read paths.
+
+`check` runs SQLite's query planner over the pipeline and earnings queries
+and reports every query whose plan contains a full table scan of
+`applications`, `payments` or the `pipeline_rows` read model. A scan along
+an index counts as a full scan too when the rows still have to be sorted
+afterwards, because then the LIMIT cannot stop the scan early.
+`python manage.py check-query-plans` exits non-zero in that case, so it can
+guard index changes in CI.
+"""
+
+import re
+from datetime import date, datetime
+
+from sqlalchemy import Engine, tuple_
+
+import read_model
+from models import Application, Payment, PipelineRow
+from queries import build_pipeline_query, earnings_items_query
+
+LARGE_TABLES = ("applications", "payments", "pipeline_rows")
+_SCAN = re.compile(r"^SCAN (\w+)\b( USING)?")
+
+
+def hot_queries() -> dict[str, object]:
+    month_start, month_end = date(2024, 1, 1), date(2024, 2, 1)
+    cursor = (datetime(2024, 1, 15), 1000)
+    return {
+        "pipeline": build_pipeline_query().limit(500),
+        "pipeline by status": build_pipeline_query(status="new").limit(500),
+        "pipeline by recruiter": build_pipeline_query(recruiter_id=1).limit(500),
+        "pipeline by client": build_pipeline_query(client_id=1).limit(500),
+        "pipeline page after cursor": build_pipeline_query()
+        .where(tuple_(Application.created_at, Application.id) < cursor)
+        .limit(101),
+        "pipeline page by status after cursor": build_pipeline_query(status="hired")
+        .where(tuple_(Application.created_at, Application.id) < cursor)
+        .limit(101),
+        "read model": read_model.build_query().limit(500),
+        "read model by status": read_model.build_query(status="new").limit(500),
+        "read model by client and status": read_model.build_query(client_id=1, status="new")
+        .limit(500),
+        "read model by recruiter and status": read_model.build_query(recruiter_id=1, status="new")
+        .limit(500),
+        "read model page by client after cursor": read_model.build_query(client_id=1)
+        .where(tuple_(PipelineRow.created_at, PipelineRow.id) < cursor)
+        .limit(101),
+        "earnings month": earnings_items_query()
+        .where(Payment.paid_date >= month_start, Payment.paid_date < month_end)
+        .order_by(Payment.paid_date.desc(), Payment.created_at.desc()),
+        "earnings items page": earnings_items_query()
+        .where(Payment.paid_date >= month_start, Payment.paid_date < month_end)
+        .order_by(Payment.paid_date.desc(), Payment.id.desc())
+        .limit(101),
+    }
+
+
+def explain(engine: Engine, stmt) -> list[str]:
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement."""
+    compiled = stmt.compile(dialect=engine.dialect)
+    params = [
+        str(value) if isinstance(value, (date, datetime)) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    ]
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), tuple(params))
+        return [row[-1] for row in rows]
+
+
+def check(engine: Engine) -> dict[str, list[str]]:
+    """
+    Return `{query name: plan}` for every hot query that fully scans one of
+    the large tables. An empty result means all of them use indexes.
+    """
+    problems = {}
+    for name, stmt in hot_queries().items():
+        plan = explain(engine, stmt)
+        sorts = any(line.startswith("USE TEMP B-TREE FOR ORDER BY") for line in plan)
+        for line in plan:
+            match = _SCAN.match(line)
+            if match and match.group(1) in LARGE_TABLES and (sorts or not match.group(2)):
+                problems[name] = plan
+                break
+    return problems
@@ -0,0 +1,144 @@
+"""
+Denormalized pipeline read model.
+
+`PipelineRow` holds every application flattened to the `ApplicationRow`
+columns, names included. Every write path that creates, changes or removes
+applications calls `refresh` or `remove` in its own transaction, like the
+funnel counters, and so would a rename of a client, recruiter, vacancy or
+candidate (with a criterion on that entity). `python manage.py
+rebuild-read-model` recomputes it from the source tables.
+
+With PIPELINE_READ_MODEL=1 the pipeline endpoints and the export read from
+it: every filter combination is one index range scan of a single table, and
+`search` matches the name columns (or the search index) without joins. The
+table is kept current either way, so switching reads on needs no rebuild.
+"""
+
+import os
+
+from sqlalchemy import delete, exists, insert, or_, select, true
+from sqlalchemy.orm import Session
+
+import search_index
+from database import upsert
+from models import Application, PipelineRow
+from queries import build_pipeline_query
+
+enabled = os.getenv("PIPELINE_READ_MODEL", "0") == "1"
+
+_COLUMNS = [
+    column.key for column in PipelineRow.__table__.columns if column.key != "created_at"
+]
+
+
+def _source(*criteria):
+    """The flattened rows of the applications matching `criteria`, in table column order."""
+    return (
+        build_pipeline_query()
+        .add_columns(Application.created_at)
+        .where(*criteria)
+        .order_by(None)
+    )
+
+
+def _ids(*criteria):
+    return build_pipeline_query().where(*criteria).with_only_columns(Application.id).order_by(None)
+
+
+def refresh(db: Session, *criteria) -> None:
+    """
+    Insert or rewrite the rows of the applications matching `criteria` in a
+    single statement. Call it after changes are flushed, within the same
+    transaction. Criteria may refer to Application, Candidate, Recruiter,
+    Vacancy and Client columns.
+    """
+    stmt = upsert(PipelineRow).from_select(
+        [*_COLUMNS, "created_at"],
+        # The WHERE keeps SQLite from parsing the upsert's ON as a join constraint
+        _source(*criteria).where(true()),
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={key: stmt.excluded[key] for key in _COLUMNS if key != "id"},
+        )
+    )
+
+
+def remove(db: Session, *criteria) -> None:
+    """Drop the rows of the applications matching `criteria`; call it before deleting them."""
+    db.execute(delete(PipelineRow).where(PipelineRow.id.in_(_ids(*criteria))))
+
+
+def rebuild(db: Session) -> None:
+    """Recompute the whole read model from the source tables."""
+    db.execute(delete(PipelineRow))
+    db.execute(insert(PipelineRow).from_select([*_COLUMNS, "created_at"], _source()))
+    db.commit()
+
+
+def ensure_populated(db: Session) -> None:
+    """Build the read model once for databases that had applications before it existed."""
+    if db.scalar(select(exists().select_from(PipelineRow))):
+        return
+    if db.scalar(select(exists().select_from(Application))):
+        rebuild(db)
+
+
+def build_query(
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    status: str | None = None,
+    search: str | None = None,
+):
+    """`build_pipeline_query` over the read model: same columns, filters and order."""
+    stmt = select(*(getattr(PipelineRow, key) for key in _COLUMNS)).order_by(
+        PipelineRow.created_at.desc(), PipelineRow.id.desc()
+    )
+    if client_id is not None:
+        stmt = stmt.where(PipelineRow.client_id == client_id)
+    if recruiter_id is not None:
+        stmt = stmt.where(PipelineRow.recruiter_id == recruiter_id)
+    if status is not None:
+        stmt = stmt.where(PipelineRow.status == status)
+    expr = (
+        search_index.match_expression(search, name_only=True)
+        if search and search_index.enabled
+        else None
+    )
+    if expr:
+        stmt = stmt.where(
+            or_(
+                PipelineRow.candidate_id.in_(search_index.matching_ids(search_index.CANDIDATE, expr)),
+                PipelineRow.vacancy_id.in_(search_index.matching_ids(search_index.VACANCY, expr)),
+                PipelineRow.client_id.in_(search_index.matching_ids(search_index.CLIENT, expr)),
+                PipelineRow.recruiter_id.in_(search_index.matching_ids(search_index.RECRUITER, expr)),
+            )
+        )
+    elif search:
+        like = f"%{search.strip()}%"
+        stmt = stmt.where(
+            or_(
+                PipelineRow.candidate_name.ilike(like),
+                PipelineRow.vacancy_title.ilike(like),
+                PipelineRow.client_name.ilike(like),
+                PipelineRow.recruiter_name.ilike(like),
+            )
+        )
+    return stmt
+
+
+def pipeline_query(
+    client_id: int | None = None,
+    recruiter_id: int | None = None,
+    status: str | None = None,
+    search: str | None = None,
+):
+    """The pipeline select for the serving endpoints: the read model when enabled, else the joins."""
+    build = build_query if enabled else build_pipeline_query
+    return build(client_id, recruiter_id, status, search)
+
+
+def sort_key():
+    """The (created_at, id) columns `pipeline_query` is ordered by, for keyset cursors."""
+    return (PipelineRow.created_at, PipelineRow.id) if enabled else (Application.created_at, Application.id)
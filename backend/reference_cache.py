@@ -0,0 +1,189 @@
+"""
+In-process cache for the small, rarely changing reference tables: clients,
+recruiters and vacancies.
+
+Each table is cached as one snapshot holding the validated rows and the
+pre-serialized JSON body of the list endpoint.
+Every snapshot records the table's data version (see data_versions.py) it
+was loaded at. `get` compares it with the current version, which the ETag
+check of the same request has usually read already, and reloads on a
+mismatch. The list bodies therefore always match their ETag, whichever
+worker or session wrote the table.
+
+Foreign-key checks do not use the cache; they load the row in the write's
+own transaction. To drop stale snapshots promptly, the create/delete
+endpoints call `invalidate` after committing, which bumps the local
+version; a load that raced with an invalidation is discarded instead of
+cached. With several workers, invalidations are forwarded through an
+optional shared channel (`CACHE_REDIS_URL`).
+"""
+
+import logging
+import os
+import threading
+from typing import Callable
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import data_versions
+from models import Client, Recruiter, Vacancy
+from schemas import ClientOut, RecruiterOut, VacancyOut
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """The cached rows of one table, in list-endpoint order."""
+
+    def __init__(
+        self,
+        items: list[BaseModel],
+        schema: type[BaseModel],
+        version: int,
+        data_version: int,
+    ):
+        self.items = items
+        self.version = version
+        self.data_version = data_version
+        self._adapter = TypeAdapter(list[schema])
+        self._bodies: dict[object, bytes] = {}
+
+    def body(self, key=None, predicate: Callable[[BaseModel], bool] | None = None) -> bytes:
+        """
+        JSON body of the list endpoint, serialized once per snapshot. A
+        filtered view is cached under `key`.
+        """
+        if key not in self._bodies:
+            items = self.items if predicate is None else [i for i in self.items if predicate(i)]
+            self._bodies[key] = self._adapter.dump_json(items)
+        return self._bodies[key]
+
+
+class LocalChannel:
+    """
+    In-process invalidation channel. It only reaches caches in the same
+    process, which makes it the stand-in for a shared channel in tests.
+    """
+
+    def __init__(self):
+        self._subscribers: list[Callable[[str], None]] = []
+
+    def publish(self, entity: str) -> None:
+        for callback in list(self._subscribers):
+            callback(entity)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.append(callback)
+
+
+class RedisChannel:
+    """Invalidation channel shared by all workers through Redis pub/sub."""
+
+    topic = "srm:reference-cache"
+
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for multi-worker setups
+
+        self._redis = redis.Redis.from_url(url)
+
+    def publish(self, entity: str) -> None:
+        self._redis.publish(self.topic, entity)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.topic: lambda message: callback(message["data"].decode())})
+        pubsub.run_in_thread(daemon=True, sleep_time=1.0)
+
+
+class ReferenceCache:
+    def __init__(
+        self,
+        loaders: dict[str, tuple[Callable[[Session], list], type[BaseModel]]],
+        channel=None,
+    ):
+        self._loaders = loaders
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, Snapshot] = {}
+        self._versions = dict.fromkeys(loaders, 0)
+        self._stats = {name: {"hits": 0, "misses": 0, "invalidations": 0} for name in loaders}
+        self._channel = channel
+        if channel is not None:
+            channel.subscribe(self._drop)
+
+    def get(self, db: Session, entity: str) -> Snapshot:
+        """
+        Return the snapshot of `entity`, loading it on a miss or when the
+        table's data version moved on since the load.
+        """
+        # Read before loading, so a snapshot is never labelled newer than its rows
+        data_version = data_versions.current(db, entity)
+        with self._lock:
+            snapshot = self._snapshots.get(entity)
+            if snapshot is not None and snapshot.data_version == data_version:
+                self._stats[entity]["hits"] += 1
+                return snapshot
+            self._stats[entity]["misses"] += 1
+            version = self._versions[entity]
+
+        load, schema = self._loaders[entity]
+        snapshot = Snapshot(
+            [schema.model_validate(row) for row in load(db)], schema, version, data_version
+        )
+        with self._lock:
+            # Only cache the load if no invalidation happened meanwhile and it
+            # does not replace a snapshot of a newer data version
+            cached = self._snapshots.get(entity)
+            newer = cached is not None and cached.data_version > data_version
+            if self._versions[entity] == version and not newer:
+                self._snapshots[entity] = snapshot
+        return snapshot
+
+    def invalidate(self, *entities: str) -> None:
+        """Drop the snapshots after a committed write and notify other workers."""
+        for entity in entities:
+            self._drop(entity)
+            if self._channel is not None:
+                try:
+                    self._channel.publish(entity)
+                except Exception:
+                    logger.exception("Could not publish cache invalidation for %s", entity)
+
+    def _drop(self, entity: str) -> None:
+        with self._lock:
+            if entity not in self._versions:
+                return
+            self._versions[entity] += 1
+            self._snapshots.pop(entity, None)
+            self._stats[entity]["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    **counters,
+                    "version": self._versions[name],
+                    "cached": name in self._snapshots,
+                    "data_version": getattr(self._snapshots.get(name), "data_version", None),
+                }
+                for name, counters in self._stats.items()
+            }
+
+
+def _channel_from_env():
+    url = os.getenv("CACHE_REDIS_URL")
+    return RedisChannel(url) if url else None
+
+
+cache = ReferenceCache(
+    {
+        "clients": (lambda db: db.scalars(select(Client).order_by(Client.name)).all(), ClientOut),
+        "recruiters": (
+            lambda db: db.scalars(select(Recruiter).order_by(Recruiter.name)).all(),
+            RecruiterOut,
+        ),
+        "vacancies": (lambda db: db.scalars(select(Vacancy).order_by(Vacancy.title)).all(), VacancyOut),
+    },
+    channel=_channel_from_env(),
+)
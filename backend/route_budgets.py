@@ -0,0 +1,307 @@
+"""
+Pinned SQL statement budgets for every API route.
+
+`check` drives the app in-process (no server, no HTTP client dependency)
+through a scenario that calls every route on a small seeded database, counts
+the statements each call runs with `query_budget`, and reports calls over
+their route's budget. Routes that the scenario does not cover, or that have
+no budget, are reported too, so a new endpoint cannot slip in unpinned.
+Lazy relationship loads during response serialization are errors here.
+
+The scenario writes to the configured database, so run it through
+`python manage.py check-query-budgets`, which points it at a temporary one.
+Several applications are seeded so a per-row query shows up as a breach
+rather than blending into a constant.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import warnings
+
+os.environ.setdefault("LAZY_LOAD_WARNINGS", "1")
+# Jobs are run by the scenario itself, so their statements are not counted
+os.environ.setdefault("JOB_WORKERS", "0")
+
+from fastapi.routing import APIRoute  # noqa: E402
+
+import asgi_client  # noqa: E402
+from query_budget import LazyLoadWarning, query_budget  # noqa: E402
+
+# Maximum statements per call, including the ETag version lookup and the
+# data version bump at commit; with an Idempotency-Key also the key claim, the
+# stored response and the occasional prune of expired keys
+BUDGETS: dict[tuple[str, str], int] = {
+    ("GET", "/health"): 0,
+    ("GET", "/health/pool"): 0,
+    ("GET", "/health/cache"): 0,
+    ("GET", "/metrics"): 0,
+    ("GET", "/"): 0,
+    ("GET", "/clients"): 2,
+    ("POST", "/clients"): 4,
+    ("DELETE", "/clients/{client_id}"): 8,
+    ("GET", "/recruiters"): 2,
+    ("POST", "/recruiters"): 4,
+    ("DELETE", "/recruiters/{recruiter_id}"): 5,
+    ("GET", "/vacancies"): 2,
+    ("POST", "/vacancies"): 4,
+    ("DELETE", "/vacancies/{vacancy_id}"): 8,
+    ("GET", "/candidates"): 1,
+    ("POST", "/candidates"): 3,
+    ("POST", "/applications"): 16,
+    ("POST", "/applications/status"): 12,
+    ("PATCH", "/applications/{app_id}"): 11,
+    ("DELETE", "/applications/{app_id}"): 10,
+    ("GET", "/applications/{app_id}/payments"): 2,
+    ("POST", "/applications/{app_id}/payments"): 11,
+    ("DELETE", "/payments/{payment_id}"): 9,
+    ("POST", "/import/{kind}"): 14,
+    ("GET", "/pipeline"): 2,
+    ("GET", "/pipeline/page"): 2,
+    ("GET", "/pipeline/stream"): 4,
+    ("GET", "/pipeline/changes"): 4,
+    ("POST", "/jobs"): 2,
+    ("GET", "/jobs"): 1,
+    ("GET", "/jobs/{job_id}"): 1,
+    ("GET", "/jobs/{job_id}/result"): 1,
+    ("POST", "/jobs/{job_id}/cancel"): 3,
+    ("GET", "/reports/earnings"): 2,
+    ("GET", "/reports/earnings/summary"): 3,
+    ("GET", "/reports/earnings/trend"): 1,
+    ("GET", "/reports/earnings/items"): 2,
+    ("GET", "/reports/funnel"): 2,
+    ("GET", "/export/pipeline"): 1,
+    ("GET", "/export/earnings"): 1,
+}
+
+ROWS = 6
+
+
+class Violation(Exception):
+    pass
+
+
+class Runner:
+    """
+    Calls the app on one event loop in a background thread, so async database
+    connections stay on the loop they were opened on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.counts: dict[tuple[str, str], int] = {}
+        self.problems: list[str] = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self) -> "Runner":
+        self._thread.start()
+        self._run(self.app.router.startup())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._run(self.app.router.shutdown())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _measured(self, method: str, url: str, body: bytes, content_type: str, headers):
+        # The budget is entered inside the task so its context reaches the threadpool
+        with query_budget(sys.maxsize, f"{method} {url}") as budget:
+            return budget, *await asgi_client.request(
+                self.app, method, url, body, content_type, headers
+            )
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        payload=None,
+        files: dict | None = None,
+        headers: dict[str, str] | None = None,
+    ):
+        if files:
+            body, content_type = _multipart(files)
+        else:
+            body = b"" if payload is None else json.dumps(payload).encode()
+            content_type = "application/json"
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", LazyLoadWarning)
+            try:
+                budget, route, status, content = self._run(
+                    self._measured(method, url, body, content_type, headers)
+                )
+            except LazyLoadWarning as exc:
+                self.problems.append(f"{method} {url}: {exc}")
+                return None
+        if status >= 400:
+            raise Violation(f"{method} {url} returned {status}: {content[:200]!r}")
+        key = (method, route)
+        self.counts[key] = max(self.counts.get(key, 0), budget.count)
+        limit = BUDGETS.get(key)
+        if limit is not None and budget.count > limit:
+            listing = "".join(f"\n    {' '.join(s.split())[:160]}" for s in budget.statements)
+            self.problems.append(
+                f"{method} {route}: {budget.count} statements, budget {limit}{listing}"
+            )
+        try:
+            return json.loads(content)
+        except ValueError:
+            return content
+
+
+def _multipart(files: dict[str, tuple[str, bytes]]) -> tuple[bytes, str]:
+    boundary = "budget-check-boundary"
+    body = b""
+    for field, (filename, data) in files.items():
+        body += (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; "
+            f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n"
+        ).encode() + data + b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def scenario(call: Runner) -> None:
+    """Exercise every route once or more, in an order where each call succeeds."""
+    import jobs
+
+    call("GET", "/health")
+    call("GET", "/health/pool")
+    call("GET", "/health/cache")
+    call("GET", "/")
+
+    clients = call("GET", "/clients")
+    client = call("POST", "/clients", {"name": "Budget Client"})
+    spare_client = call("POST", "/clients", {"name": "Spare Client"})
+    recruiter = call("POST", "/recruiters", {"name": "Budget Recruiter"})
+    spare_recruiter = call("POST", "/recruiters", {"name": "Spare Recruiter"})
+    call("GET", "/recruiters")
+    vacancy = call(
+        "POST", "/vacancies", {"client_id": client["id"], "title": "Engineer", "fee_amount": 1000}
+    )
+    spare_vacancy = call(
+        "POST", "/vacancies", {"client_id": clients[0]["id"], "title": "Spare", "fee_amount": 10}
+    )
+    call("GET", "/vacancies")
+    call("GET", f"/vacancies?client_id={client['id']}")
+
+    applications = []
+    for i in range(ROWS):
+        candidate = call("POST", "/candidates", {"full_name": f"Budget Candidate {i}"})
+        hired = i % 2 == 0
+        applications.append(
+            call(
+                "POST",
+                "/applications",
+                {
+                    "candidate_id": candidate["id"],
+                    "vacancy_id": vacancy["id"],
+                    "recruiter_id": recruiter["id"],
+                    "date_contacted": "2024-03-01",
+                    "status": "hired" if hired else "new",
+                    "start_date": "2024-03-20" if hired else None,
+                    "paid": hired,
+                    "paid_date": "2024-03-25" if hired else None,
+                },
+                headers={"Idempotency-Key": f"budget-application-{i}"} if i == 0 else None,
+            )
+        )
+    call("GET", "/candidates")
+    call("GET", "/candidates?q=Budget")
+
+    app_id = applications[1]["id"]
+    call("PATCH", f"/applications/{app_id}", {"status": "in_process"})
+    call(
+        "POST",
+        "/applications/status",
+        {"ids": [a["id"] for a in applications[1:4]], "status": "rejected", "rejection_date": "2024-04-01"},
+    )
+    payment = call("POST", f"/applications/{app_id}/payments", {"paid_date": "2024-03-28", "amount": 100})
+    retry = {"paid_date": "2024-03-29", "amount": 50}
+    for _ in range(2):
+        call("POST", f"/applications/{app_id}/payments", retry, headers={"Idempotency-Key": "budget-1"})
+    call("GET", f"/applications/{app_id}/payments")
+    call("DELETE", f"/payments/{payment['id']}")
+
+    csv_rows = "full_name,phone\n" + "".join(f"Imported {i},555-{i}\n" for i in range(ROWS))
+    call("POST", "/import/candidates?format=csv", files={"file": ("c.csv", csv_rows.encode())})
+    jsonl = "".join(
+        json.dumps(
+            {
+                "candidate_id": applications[0]["candidate_id"],
+                "vacancy_id": vacancy["id"],
+                "recruiter_id": recruiter["id"],
+                "date_contacted": "2024-03-02",
+            }
+        )
+        + "\n"
+        for _ in range(ROWS)
+    )
+    call("POST", "/import/applications?format=jsonl", files={"file": ("a.jsonl", jsonl.encode())})
+
+    call("GET", "/pipeline")
+    call("GET", f"/pipeline?status=hired&recruiter_id={recruiter['id']}")
+    call("GET", "/pipeline/stream?since=0&follow=false")
+    call("GET", "/pipeline/changes")
+    call("GET", "/pipeline/changes?since=0&limit=1")
+    call("GET", f"/pipeline/stream?since=1&follow=false&recruiter_id={recruiter['id']}")
+    page = call("GET", "/pipeline/page?limit=2")
+    call("GET", f"/pipeline/page?limit=2&cursor={page['next_cursor']}")
+    call("GET", "/reports/earnings?year=2024&month=3")
+    call("GET", "/reports/earnings/summary?year=2024&month=3")
+    call("GET", "/reports/earnings/trend?start_year=2024&start_month=1&end_year=2024&end_month=6")
+    items = call("GET", "/reports/earnings/items?year=2024&month=3&limit=2")
+    call("GET", f"/reports/earnings/items?year=2024&month=3&limit=2&cursor={items['next_cursor']}")
+    call("GET", "/reports/funnel")
+    call("GET", "/reports/funnel?group_by=recruiter")
+    call("GET", "/export/pipeline?format=csv")
+    call("GET", "/export/earnings?format=ndjson")
+    call("GET", "/metrics")
+
+    report = call("POST", "/jobs", {"kind": "earnings-year", "params": {"year": 2024}})
+    queued = call("POST", "/jobs", {"kind": "rebuild-stats"})
+    call("POST", f"/jobs/{queued['id']}/cancel")
+    jobs.run_pending()
+    call("GET", "/jobs")
+    call("GET", f"/jobs/{report['id']}")
+    call("GET", f"/jobs/{report['id']}/result")
+
+    call("DELETE", f"/applications/{applications[-1]['id']}")
+    call("DELETE", f"/vacancies/{spare_vacancy['id']}")
+    call("DELETE", f"/recruiters/{spare_recruiter['id']}")
+    call("DELETE", f"/clients/{spare_client['id']}")
+
+
+def check() -> list[str]:
+    """Run the scenario and return the problems found; empty means all budgets hold."""
+    import main
+
+    with Runner(main.app) as call:
+        try:
+            scenario(call)
+        except Violation as exc:
+            return [str(exc)]
+
+    problems = list(call.problems)
+    for route in main.app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        for method in route.methods:
+            key = (method, route.path)
+            if key not in BUDGETS:
+                problems.append(f"{method} {route.path}: no budget pinned")
+            elif key not in call.counts:
+                problems.append(f"{method} {route.path}: not covered by the scenario")
+    return problems
+
+
+if __name__ == "__main__":
+    found = check()
+    for problem in found:
+        print(problem)
+    sys.exit(1 if found else 0)
@@ -2,14 +2,16 @@
 Pydantic schemas used for request and response validation in the API.
 
 This module defines schemas for clients, recruiters, vacancies, candidates,
-applications, payments and reports. Pydantic's BaseModel is used to
-validate data both in incoming requests and outgoing responses. Some
+applications, payments, reports and background jobs. Pydantic's BaseModel
+is used to validate data both in incoming requests and outgoing responses. Some
 schemas represent only the common input fields while others include the
 database generated fields (e.g. id, created_at).
 """
 
 from datetime import date, datetime
-from pydantic import BaseModel, Field
+from typing import Any
+
+from pydantic import BaseModel, Field, Json
 
 __all__ = [
     "ClientCreate",
@@ -23,11 +25,31 @@ __all__ = [
     "ApplicationCreate",
     "ApplicationUpdate",
     "ApplicationOut",
+    "StatusBatch",
+    "StatusResult",
+    "StatusBatchReport",
     "PaymentCreate",
     "PaymentOut",
     "ApplicationRow",
+    "PipelinePage",
+    "PipelineChanges",
     "EarningsItem",
     "EarningsReport",
+    "EarningsBreakdown",
+    "EarningsSummary",
+    "EarningsMonth",
+    "EarningsTrend",
+    "EarningsItemsPage",
+    "DurationBucket",
+    "DurationStats",
+    "FunnelGroup",
+    "FunnelStats",
+    "ImportRowError",
+    "ImportReport",
+    "JobCreate",
+    "JobOut",
+    "CheckPaymentsParams",
+    "EarningsYearParams",
 ]
 
 
@@ -137,6 +159,28 @@ class ApplicationUpdate(BaseModel):
     replacement_note: str | None = None
 
 
+class StatusBatch(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=1000)
+    status: str
+    # Like PATCH: an omitted date keeps the stored value, null clears it
+    rejection_date: date | None = None
+    start_date: date | None = None
+    # Reject the whole batch if any application fails
+    atomic: bool = False
+
+
+class StatusResult(BaseModel):
+    id: int
+    ok: bool
+    error: str | None = None
+
+
+class StatusBatchReport(BaseModel):
+    updated: int
+    failed: int
+    results: list[StatusResult]
+
+
 class ApplicationOut(BaseModel):
     id: int
     candidate_id: int
@@ -157,6 +201,7 @@ class ApplicationOut(BaseModel):
     replacement_note: str | None
 
     created_at: datetime
+    updated_at: datetime
 
     class Config:
         from_attributes = True
@@ -210,6 +255,24 @@ class ApplicationRow(BaseModel):
     client_name: str
 
 
+class PipelinePage(BaseModel):
+    items: list[ApplicationRow]
+    next_cursor: str | None
+    has_more: bool
+
+
+class PipelineChanges(BaseModel):
+    # Rows inserted or changed since the token, in their current state
+    changes: list[ApplicationRow]
+    # Ids of applications deleted since the token
+    deleted: list[int]
+    # Pass as `since` on the next request
+    token: int
+    has_more: bool
+    # The token is too old: reload /pipeline and continue from `token`
+    reset: bool = False
+
+
 # ------------------ Earnings Report ------------------
 class EarningsItem(BaseModel):
     payment_id: int
@@ -226,4 +289,115 @@ class EarningsReport(BaseModel):
     year: int
     month: int
     total: float
-    items: list[EarningsItem]
\ No newline at end of file
+    items: list[EarningsItem]
+
+
+class EarningsBreakdown(BaseModel):
+    id: int
+    name: str
+    total: float
+    payment_count: int
+
+
+class EarningsSummary(BaseModel):
+    year: int
+    month: int
+    total: float
+    payment_count: int
+    by_client: list[EarningsBreakdown]
+    by_recruiter: list[EarningsBreakdown]
+
+
+class EarningsMonth(BaseModel):
+    year: int
+    month: int
+    total: float
+    payment_count: int
+
+
+class EarningsTrend(BaseModel):
+    total: float
+    months: list[EarningsMonth]
+
+
+class EarningsItemsPage(BaseModel):
+    items: list[EarningsItem]
+    next_cursor: str | None
+    has_more: bool
+
+
+# ------------------ Funnel Statistics ------------------
+class DurationBucket(BaseModel):
+    min_days: int
+    max_days: int | None  # None for the open-ended last bucket
+    count: int
+
+
+class DurationStats(BaseModel):
+    count: int
+    mean_days: float | None
+    median_days: int | None
+    p90_days: int | None
+    buckets: list[DurationBucket]
+
+
+class FunnelGroup(BaseModel):
+    id: int | None
+    name: str | None
+    total: int
+    by_status: dict[str, int]
+    hire_rate: float
+    rejection_rate: float
+    time_to_hire: DurationStats
+    time_to_rejection: DurationStats
+
+
+class FunnelStats(BaseModel):
+    overall: FunnelGroup
+    groups: list[FunnelGroup]
+
+
+# ------------------ Bulk Import ------------------
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[ImportRowError]
+
+
+# ------------------ Background Jobs ------------------
+class JobCreate(BaseModel):
+    kind: str
+    params: dict[str, Any] = Field(default_factory=dict)
+
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    params: Json[dict[str, Any]]
+    status: str  # queued, running, succeeded, failed, cancelled
+    done: int
+    total: int | None
+    message: str | None
+    error: str | None
+    cancel_requested: bool
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
+
+
+class CheckPaymentsParams(BaseModel):
+    repair: bool = False
+
+
+class EarningsYearParams(BaseModel):
+    year: int = Field(ge=2000, le=2100)
+    client_id: int | None = None
+    recruiter_id: int | None = None
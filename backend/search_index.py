@@ -0,0 +1,165 @@
+"""
+Full-text search index for candidates and pipeline search.
+
+All searchable names live in a single SQLite FTS5 table, `search_fts`, with
+two indexed columns: `name` (candidate full name, vacancy title, client and
+recruiter name) and `contact` (candidate phone and email). The rowid of an
+entry encodes which entity it belongs to as ``entity_id * 4 + kind`` so that
+triggers can update or delete a single entry by rowid and queries can map
+hits back to ids without a join.
+
+The index is kept in sync by triggers on the source tables, so every write
+path (ORM, bulk inserts, cascading deletes) updates it in the same
+transaction. When FTS5 is not available, or the database is not SQLite,
+`enabled` stays False and callers fall back to LIKE matching.
+"""
+
+import re
+
+from sqlalchemy import Engine, column, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+
+# Entity kinds, encoded in the low bits of the FTS rowid
+CANDIDATE = 0
+VACANCY = 1
+CLIENT = 2
+RECRUITER = 3
+
+# Set by `install` (or `detect`) once the index and its triggers are in place
+enabled = False
+
+search_fts = table("search_fts", column("rowid"), column("rank"))
+
+# (kind, source table, name expression, contact expression)
+_SOURCES = [
+    (
+        CANDIDATE,
+        "candidates",
+        "{row}.full_name",
+        "coalesce({row}.phone, '') || ' ' || coalesce({row}.email, '')",
+    ),
+    (VACANCY, "vacancies", "{row}.title", "''"),
+    (CLIENT, "clients", "{row}.name", "''"),
+    (RECRUITER, "recruiters", "{row}.name", "''"),
+]
+
+
+def _trigger_ddl() -> list[str]:
+    statements = []
+    for kind, source, name, contact in _SOURCES:
+        insert = (
+            "INSERT INTO search_fts(rowid, name, contact) "
+            f"VALUES (new.id * 4 + {kind}, {name.format(row='new')}, "
+            f"{contact.format(row='new')});"
+        )
+        delete = f"DELETE FROM search_fts WHERE rowid = old.id * 4 + {kind};"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {source}_fts_ai AFTER INSERT ON {source} "
+            f"BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {source}_fts_au AFTER UPDATE ON {source} "
+            f"BEGIN {delete} {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {source}_fts_ad AFTER DELETE ON {source} "
+            f"BEGIN {delete} END",
+        ]
+    return statements
+
+
+def _exists(conn) -> bool:
+    return bool(
+        conn.scalar(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"))
+    )
+
+
+def detect(engine: Engine) -> bool:
+    """
+    Set `enabled` from an index created earlier by `install`, without any DDL.
+    Used on the serving path, where bootstrap has already run.
+    """
+    global enabled
+    if engine.dialect.name != "sqlite":
+        enabled = False
+        return enabled
+    with engine.connect() as conn:
+        enabled = _exists(conn)
+    return enabled
+
+
+def install(engine: Engine) -> bool:
+    """
+    Create the FTS5 table and its sync triggers if they do not exist yet.
+    A freshly created index is populated from the existing rows. Returns
+    whether full-text search is available.
+    """
+    global enabled
+    if engine.dialect.name != "sqlite":
+        enabled = False
+        return enabled
+    try:
+        with engine.begin() as conn:
+            exists = _exists(conn)
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+                "name, contact, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            for ddl in _trigger_ddl():
+                conn.exec_driver_sql(ddl)
+            if not exists:
+                _populate(conn)
+    except OperationalError:
+        # SQLite was built without FTS5
+        enabled = False
+        return enabled
+    enabled = True
+    return enabled
+
+
+def _populate(conn) -> None:
+    for kind, source, name, contact in _SOURCES:
+        conn.exec_driver_sql(
+            "INSERT INTO search_fts(rowid, name, contact) "
+            f"SELECT id * 4 + {kind}, {name.format(row=source)}, "
+            f"{contact.format(row=source)} FROM {source}"
+        )
+
+
+def rebuild(engine: Engine) -> None:
+    """Drop all index entries and re-index every source row."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM search_fts")
+        _populate(conn)
+        conn.exec_driver_sql("INSERT INTO search_fts(search_fts) VALUES ('optimize')")
+
+
+def match_expression(q: str, name_only: bool = False) -> str | None:
+    """
+    Turn free-form user input into an FTS5 query where every word is a
+    prefix term and all words must match. Returns None if the input has no
+    searchable words.
+    """
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    expr = " AND ".join(f'"{term}"*' for term in terms)
+    return f"name : ({expr})" if name_only else expr
+
+
+def matches(kind: int, expr: str):
+    """
+    Select `(ref_id, rank)` of index entries of the given kind that match an
+    expression from `match_expression`. Lower rank is a better match.
+    """
+    return (
+        select(
+            (search_fts.c.rowid // 4).label("ref_id"),
+            search_fts.c.rank.label("rank"),
+        )
+        .where(literal_column("search_fts").op("MATCH")(expr))
+        .where(search_fts.c.rowid % 4 == kind)
+    )
+
+
+def matching_ids(kind: int, expr: str):
+    """Select only the ids of matching entities, for use in IN (...) filters."""
+    return matches(kind, expr).with_only_columns(
+        (search_fts.c.rowid // 4).label("ref_id")
+    )
@@ -0,0 +1,37 @@
+"""
+Fast-path JSON serialization for large row lists.
+
+The pipeline and earnings endpoints used to build one pydantic model per
+result row, which FastAPI then validated a second time against the
+`response_model` before encoding it. The selected columns already have the
+types the schemas declare, so these helpers write the rows straight to JSON
+with pydantic-core's encoder (dates as ISO strings, like the models) and the
+endpoints return the bytes as a `Response`. The `response_model` stays on
+the routes for the OpenAPI schema only.
+"""
+
+from typing import Any, Iterable, Sequence
+
+from fastapi import Response
+from pydantic_core import to_json
+from sqlalchemy import Row
+
+import metrics
+
+
+def row_dicts(rows: Iterable[Row], exclude: Sequence[str] = ()) -> list[dict[str, Any]]:
+    """Rows as plain dicts keyed by column label, without the `exclude` columns."""
+    rows = list(rows)
+    if not rows:
+        return []
+    fields = [name for name in rows[0]._fields if name not in exclude]
+    if len(fields) == len(rows[0]._fields):
+        return [row._asdict() for row in rows]
+    return [{name: getattr(row, name) for name in fields} for row in rows]
+
+
+def json_response(content: Any, headers: dict[str, str] | None = None) -> Response:
+    """Encode `content` (dicts, lists, dates, numbers) without validating it."""
+    with metrics.serializing():
+        body = to_json(content)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,93 @@
+"""
+Cold start profile, enabled with `STARTUP_PROFILE=1`.
+
+main.py marks the end of each startup phase (module imports, app and route
+setup, database preparation, the remaining startup events) and, once the
+first request has been served, one line with the phase durations and the
+total time to first response is logged as a warning on the `srm.startup`
+logger (visible without logging configuration, like the slow request log),
+flagged when it exceeds `TARGET_MS`. Times count from process start where
+/proc exposes it (Linux), so interpreter and server imports are included;
+elsewhere they count from the import of this module. Idle time between
+startup and the arrival of the first request is not counted.
+"""
+
+import logging
+import os
+import time
+
+ENABLED = os.getenv("STARTUP_PROFILE", "0") == "1"
+TARGET_MS = 300
+
+logger = logging.getLogger("srm.startup")
+
+
+def _process_age() -> float:
+    """Seconds since this process started, 0.0 when unknown."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the start time in clock ticks after boot; the command
+            # name (field 2) may contain spaces, so split after its ")"
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+
+
+_started = time.perf_counter() - (_process_age() if ENABLED else 0.0)
+_last = _started
+_phases: list[tuple[str, float]] = []
+_reported = False
+
+
+def mark(phase: str) -> None:
+    """Record that `phase` ended now."""
+    global _last
+    if not ENABLED:
+        return
+    now = time.perf_counter()
+    _phases.append((phase, now - _last))
+    _last = now
+
+
+def report(handling: float) -> None:
+    """Log the profile; `handling` is how long the first request took."""
+    global _reported
+    if _reported:
+        return
+    _reported = True
+    _phases.append(("first request", handling))
+    # Idle time between being ready and the first request arriving is excluded
+    total_ms = (_last - _started + handling) * 1000
+    phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in _phases)
+    verdict = "over" if total_ms > TARGET_MS else "within"
+    logger.warning(
+        "first response after %.0fms, %s the %dms target: %s",
+        total_ms, verdict, TARGET_MS, phases,
+    )
+
+
+class FirstRequestMiddleware:
+    """Marks the end of the lifespan startup and reports after the first request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+
+            async def send_marked(message):
+                if message["type"] == "lifespan.startup.complete":
+                    mark("startup events")
+                await send(message)
+
+            await self.app(scope, receive, send_marked)
+            return
+        if scope["type"] != "http" or _reported:
+            await self.app(scope, receive, send)
+            return
+        began = time.perf_counter()
+        await self.app(scope, receive, send)
+        report(time.perf_counter() - began)
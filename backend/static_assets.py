@@ -0,0 +1,69 @@
+"""
+Frontend static files with precompressed variants and cache headers.
+
+The frontend build (frontend/vite.config.ts) writes `.br` and `.gz` files
+next to every compressible file in frontend/dist. `FrontendFiles` serves the
+variant the client accepts (brotli first) with `Content-Encoding` and
+`Vary: Accept-Encoding`, falling back to the plain file, and sets
+`Cache-Control` on every response. The ETag comes from the file actually
+sent, so each encoding has its own.
+
+Vite puts a content hash in every file name under /assets, so those are
+cached for a year as immutable. index.html keeps its name across deploys and
+is served with `no-cache`: browsers revalidate it by ETag on every visit and
+pick up a new deploy immediately, at the cost of a 304.
+"""
+
+import os
+from mimetypes import guess_type
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from compression import accepts
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# (Content-Encoding, file suffix) in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class FrontendFiles(StaticFiles):
+    def __init__(self, *args, cache_control: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        accept = request_headers.get("accept-encoding", "")
+        headers = {"Cache-Control": self.cache_control}
+        path = str(full_path)
+        for encoding, suffix in ENCODINGS:
+            try:
+                variant_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            headers["Vary"] = "Accept-Encoding"
+            if accepts(accept, encoding):
+                headers["Content-Encoding"] = encoding
+                full_path, stat_result = path + suffix, variant_stat
+                break
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            media_type=guess_type(path)[0] or "text/plain",
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,73 @@
+"""
+Batch status transitions for applications.
+
+A batch sets one status (and optionally the rejection/start dates) on many
+applications at once. The stored dates of all applications are read with a
+single query, the status/date rule is checked once per distinct combination,
+and every application that passes is written with one set-based UPDATE in
+the same transaction. Failures are reported per id; with `atomic` a single
+failure rejects the whole batch.
+"""
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import change_feed
+import pipeline_stats
+import read_model
+from models import Application
+from schemas import StatusBatch, StatusBatchReport, StatusResult
+from validation import StatusRules
+
+
+def apply(db: Session, batch: StatusBatch) -> StatusBatchReport:
+    ids = list(dict.fromkeys(batch.ids))
+    stored = {
+        row.id: row
+        for row in db.execute(
+            select(Application.id, Application.rejection_date, Application.start_date).where(
+                Application.id.in_(ids)
+            )
+        )
+    }
+    dates = {
+        name: getattr(batch, name)
+        for name in ("rejection_date", "start_date")
+        if name in batch.model_fields_set
+    }
+
+    rules = StatusRules()
+    results: list[StatusResult] = []
+    for app_id in ids:
+        row = stored.get(app_id)
+        if row is None:
+            results.append(StatusResult(id=app_id, ok=False, error="Application not found"))
+            continue
+        error = rules.error(
+            batch.status,
+            dates.get("rejection_date", row.rejection_date),
+            dates.get("start_date", row.start_date),
+        )
+        results.append(StatusResult(id=app_id, ok=error is None, error=error))
+
+    valid = [result.id for result in results if result.ok]
+    report = StatusBatchReport(
+        updated=len(valid), failed=len(results) - len(valid), results=results
+    )
+    if report.failed and batch.atomic:
+        report.updated = 0
+        raise HTTPException(400, report.model_dump())
+    if valid:
+        pipeline_stats.apply(db, Application.id.in_(valid), sign=-1)
+        db.execute(
+            update(Application)
+            .where(Application.id.in_(valid))
+            .values(status=batch.status, **dates)
+            .execution_options(synchronize_session=False)
+        )
+        pipeline_stats.apply(db, Application.id.in_(valid))
+        read_model.refresh(db, Application.id.in_(valid))
+        change_feed.record(db, Application.id.in_(valid))
+    db.commit()
+    return report
@@ -0,0 +1,62 @@
+"""
+Runs the query plan and query budget checks of manage.py as tests, in sync
+and in DB_ASYNC=1 mode.
+
+The database settings are read at import time, so every check runs in a
+subprocess against a throwaway SQLite database.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+QUERY_PLANS = """
+import sys
+import migrations
+import query_plans
+from database import engine
+
+migrations.upgrade(engine)
+problems = query_plans.check(engine)
+for name, plan in problems.items():
+    print(name, *plan, sep="\\n    ")
+sys.exit(1 if problems else 0)
+"""
+
+ROUTE_BUDGETS = """
+import sys
+import route_budgets
+
+problems = route_budgets.check()
+print(*problems, sep="\\n")
+sys.exit(1 if problems else 0)
+"""
+
+
+def run(script: str, workdir: Path, db_async: str) -> subprocess.CompletedProcess:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir}/check.db",
+        DB_ASYNC=db_async,
+        PYTHONPATH=os.pathsep.join(filter(None, [str(BACKEND), os.getenv("PYTHONPATH")])),
+    )
+    return subprocess.run(
+        [sys.executable, "-c", script], cwd=workdir, env=env, capture_output=True, text=True
+    )
+
+
+@pytest.mark.parametrize("db_async", ["0", "1"], ids=["sync", "async"])
+def test_hot_queries_use_indexes(tmp_path, db_async):
+    result = run(QUERY_PLANS, tmp_path, db_async)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+@pytest.mark.parametrize("db_async", ["0", "1"], ids=["sync", "async"])
+def test_routes_within_query_budgets(tmp_path, db_async):
+    result = run(ROUTE_BUDGETS, tmp_path, db_async)
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,44 @@
+"""
+Business rules shared by the API endpoints and the bulk import.
+"""
+
+from datetime import date
+
+from fastapi import HTTPException
+
+VALID_STATUSES = {"new", "in_process", "rejected", "hired"}
+
+
+def enforce_dates_for_status(status: str, rejection_date: date | None, start_date: date | None):
+    """
+    Validate that the appropriate dates are supplied for the given status.
+    If the status is 'rejected', a rejection_date is required.
+    If the status is 'hired', a start_date is required.
+    """
+    if status not in VALID_STATUSES:
+        raise HTTPException(400, f"Invalid status: {status}")
+    if status == "rejected" and rejection_date is None:
+        raise HTTPException(400, "For status 'rejected' rejection_date is required")
+    if status == "hired" and start_date is None:
+        raise HTTPException(400, "For status 'hired' start_date is required")
+
+
+class StatusRules:
+    """
+    Memoized `enforce_dates_for_status`. The outcome only depends on the
+    status and on which dates are present, so each combination is checked
+    once per batch. `error` returns the message, or None if the rule holds.
+    """
+
+    def __init__(self):
+        self._cache: dict[tuple, str | None] = {}
+
+    def error(self, status: str, rejection_date: date | None, start_date: date | None) -> str | None:
+        key = (status, rejection_date is None, start_date is None)
+        if key not in self._cache:
+            try:
+                enforce_dates_for_status(status, rejection_date, start_date)
+                self._cache[key] = None
+            except HTTPException as exc:
+                self._cache[key] = exc.detail
+        return self._cache[key]
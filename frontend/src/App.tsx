@@ -217,6 +217,42 @@ export default function App() {
     refreshPipeline();
   }, [filters.client_id, filters.recruiter_id, filters.status, filters.search]);
 
+  // Apply colleagues' changes as they happen instead of re-fetching the pipeline
+  const [streamEpoch, setStreamEpoch] = useState(0);
+  useEffect(() => {
+    // The stream is only filtered by client and recruiter, so status and search
+    // are checked here. Search terms are matched as substrings of the names,
+    // which may keep a row the server-side search would not return.
+    const terms = (filters.search ?? "").toLowerCase().split(/\s+/).filter(Boolean);
+    const matchesFilters = (row: PipelineRow) => {
+      if (filters.status && row.status !== filters.status) return false;
+      const text = [row.candidate_name, row.vacancy_title, row.client_name, row.recruiter_name]
+        .join(" ")
+        .toLowerCase();
+      return terms.every((t) => text.includes(t));
+    };
+    const source = api.pipelineStream(
+      { client_id: filters.client_id, recruiter_id: filters.recruiter_id },
+      {
+        onUpsert: (row) =>
+          setPipeline((rows) => {
+            // Rows that no longer match the active filters leave the list
+            if (!matchesFilters(row)) return rows.filter((r) => r.id !== row.id);
+            const i = rows.findIndex((r) => r.id === row.id);
+            if (i >= 0) return rows.map((r) => (r.id === row.id ? row : r));
+            // New rows are only added when no search filter could exclude them
+            return terms.length ? rows : [row, ...rows];
+          }),
+        onDelete: (id) => setPipeline((rows) => rows.filter((r) => r.id !== id)),
+        onReset: () => {
+          refreshPipeline();
+          setStreamEpoch((n) => n + 1);
+        },
+      }
+    );
+    return () => source.close();
+  }, [filters.client_id, filters.recruiter_id, filters.status, filters.search, streamEpoch]);
+
   // Persist active recruiter selection to localStorage and update default recruiter in add form
   useEffect(() => {
     if (activeRecruiterId) {
@@ -178,6 +178,26 @@ export const api = {
     const qs = sp.toString();
     return http<PipelineRow[]>(qs ? `/pipeline?${qs}` : "/pipeline");
   },
+  // Live pipeline changes (Server-Sent Events). The browser reconnects on its
+  // own and resumes from the last received event; onReset means the server
+  // could not resume and the pipeline has to be reloaded.
+  pipelineStream: (
+    params: { client_id?: number; recruiter_id?: number },
+    handlers: { onUpsert: (row: PipelineRow) => void; onDelete: (id: number) => void; onReset: () => void }
+  ) => {
+    const sp = new URLSearchParams();
+    if (params.client_id) sp.set("client_id", String(params.client_id));
+    if (params.recruiter_id) sp.set("recruiter_id", String(params.recruiter_id));
+    const qs = sp.toString();
+    const source = new EventSource(`${API}/pipeline/stream${qs ? `?${qs}` : ""}`);
+    source.addEventListener("upsert", (e) => handlers.onUpsert(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener("delete", (e) => handlers.onDelete(JSON.parse((e as MessageEvent).data).id));
+    source.addEventListener("reset", () => {
+      source.close();
+      handlers.onReset();
+    });
+    return source;
+  },
 
   // Applications
   createApplication: (payload: ApplicationCreate) =>
@@ -1,9 +1,52 @@
-import { defineConfig } from "vite";
+import { defineConfig, type Plugin } from "vite";
 import react from "@vitejs/plugin-react";
+import { readdir, readFile, writeFile } from "node:fs/promises";
+import { join } from "node:path";
+import { brotliCompressSync, constants, gzipSync } from "node:zlib";
 
-// Vite configuration for React development. It sets up the React plugin
-// and configures the dev server port to 5173.
+// Text files worth compressing, and the size below which it does not pay off
+const COMPRESSIBLE = /\.(js|mjs|css|html|svg|json|txt|map)$/;
+const MIN_SIZE = 1024;
+
+async function* walk(dir: string): AsyncGenerator<string> {
+  for (const entry of await readdir(dir, { withFileTypes: true })) {
+    const path = join(dir, entry.name);
+    if (entry.isDirectory()) yield* walk(path);
+    else yield path;
+  }
+}
+
+// Writes .br and .gz next to every compressible build output, at maximum
+// compression since it runs once per build; the backend serves them by
+// Accept-Encoding (backend/static_assets.py).
+function precompress(outDir = "dist"): Plugin {
+  return {
+    name: "precompress",
+    apply: "build",
+    async closeBundle() {
+      for await (const path of walk(outDir)) {
+        if (!COMPRESSIBLE.test(path)) continue;
+        const data = await readFile(path);
+        if (data.length < MIN_SIZE) continue;
+        await writeFile(
+          `${path}.br`,
+          brotliCompressSync(data, {
+            params: {
+              [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+              [constants.BROTLI_PARAM_SIZE_HINT]: data.length
+            }
+          })
+        );
+        await writeFile(`${path}.gz`, gzipSync(data, { level: 9 }));
+      }
+    }
+  };
+}
+
+// Vite configuration for React development. It sets up the React plugin,
+// precompresses the production build and configures the dev server port
+// to 5173.
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), precompress()],
   server: { port: 5173 }
-});
\ No newline at end of file
+});